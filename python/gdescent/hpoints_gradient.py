@@ -141,29 +141,7 @@ def calculate_A_matrix_autograd(x1,y1,x2,y2,x3,y3,x4,y4,P,normalize=False):
 # THIS FUNCTION DOESNT WORK WITH NORMALIZATION YET
 def volker_metric_autograd(x1,y1,x2,y2,x3,y3,x4,y4,P):
   A = calculate_A_matrix_autograd(x1,y1,x2,y2,x3,y3,x4,y4,P)
-
-  row_sums = list()
-  for i in range(A.shape[0]):
-    squared_sum = 0
-    for j in range(A.shape[1]):
-      squared_sum += np.sqrt(A[i,j]**2)
-    row_sums.append(squared_sum)
-
-  row_sums = np.array(row_sums).reshape(1,8)
-  A = A/(row_sums.T)
-
-  # compute the dot product
-  As = np.dot(A,A.T)
-
-  # we are interested only on the upper top triangular matrix coefficients
-  metric = 0
-  start = 1
-  for i in range(As.shape[0]):
-    for j in range(start,As.shape[0]):
-      metric = metric +  As[i,j]**2
-    start = start +1
-
-  return  metric
+  return volker_metric(A)
 
 # DONT USE PNORM
 def matrix_pnorm_condition_number_autograd(x1,y1,x2,y2,x3,y3,x4,y4,P):
@@ -168,43 +168,7 @@ def calculate_A_matrix_autograd(x1,y1,x2,y2,x3,y3,x4,y4,x5,y5,P,normalize=False)
 # THIS FUNCTION DOESNT WORK WITH NORMALIZATION YET
 def volker_metric_autograd(x1,y1,x2,y2,x3,y3,x4,y4,x5,y5,P):
   A = calculate_A_matrix_autograd(x1,y1,x2,y2,x3,y3,x4,y4,x5,y5,P)
-
-  # nomarlize each row
-  #A = A/np.linalg.norm(A,axis=1, ord = 1, keepdims=True)
-  row_sums = list()
-  for i in range(A.shape[0]):
-    squared_sum = 0
-    for j in range(A.shape[1]):
-      squared_sum += np.sqrt(A[i,j]**2)
-    #A[i,:] = A[i,:] / squared_sum
-    row_sums.append(squared_sum)
-
-  row_sums = np.array(row_sums).reshape(1,10)
-
-  A = A/(row_sums.T)
-  # compute the dot product
-  As = np.dot(A,A.T)
-
-  # we are interested only on the upper top triangular matrix coefficients
-  metric = 0
-  start = 1
-  for i in range(As.shape[0]):
-    for j in range(start,As.shape[0]):
-      metric = metric +  As[i,j]**2
-    start = start +1
-
-
-  #An alternative would be to use only the coefficients which correspond
-  # to different points.
-  #metric = np.sqrt(np.sum(As[[0,2,4,6],[1,3,5,7]]**2))
-
-  #X vs X
-  #metric = np.sum(As[[0,0,0,2,2,4],[2,4,6,4,6,6]]**2)
-
-  #Y vs Y
-  #metric = metric + np.sum(As[[1,1,1,3,3,5],[3,5,7,5,7,7]]**2)
-
-  return  metric
+  return volker_metric(A)
 
 # DONT USE PNORM
 def matrix_pnorm_condition_number_autograd(x1,y1,x2,y2,x3,y3,x4,y4,x5,y5,P):
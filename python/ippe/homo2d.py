@@ -1,37 +1,30 @@
 import numpy as np
 
-def homography2d(x1, x2):
+def homography2d(x1, x2, mask=None):
     """
     Direct Linear Transform
 
     Input:
     x1: 3xN set of homogeneous points
     x2: 3xN set of homogeneous points such that x1<->x2
+    mask: optional boolean array of length N, only the True points are used
 
     Returns:
     H: the 3x3 homography such that x2 = H*x1
     """
+    if mask is not None:
+        x1 = np.asarray(x1)[:,mask]
+        x2 = np.asarray(x2)[:,mask]
     x1 = np.copy(x1)
     x2 = np.copy(x2)
     [x1, T1] = normalise2dpts(x1)
     [x2, T2] = normalise2dpts(x2)
 
-    Npts = x1.shape[1]
+    A = dlt_matrix(x1, x2)
 
-    A = np.zeros((2*Npts,9))
-
-    O = np.zeros(3);
-
-    for i in range(0, Npts):
-        X = x1[:,i].T
-        x = x2[0,i]
-        y = x2[1,i]
-        w = x2[2,i]
-        A[2*i,:] = np.array([O, -w*X, y*X]).reshape(1, 9)
-        A[2*i+1,:] = np.array([w*X, O, -x*X]).reshape(1, 9)
-        #A[3*i+2,:] = np.array([-y*X, x*X, O]).reshape(1, 9) #omitted since only two equations are independent
-
-    [U,D,Vh] = np.linalg.svd(A)
+    # the full Vh is only needed to get the null vector when there are less
+    # than 9 equations, U is never used
+    [U,D,Vh] = np.linalg.svd(A, full_matrices = A.shape[0] < 9)
     V = Vh.T
 
     H = V[:,8].reshape(3,3)
@@ -44,6 +37,37 @@ def homography2d(x1, x2):
     return H, A,inter_H
 
 
+def dlt_matrix(x1, x2):
+    """
+    A matrix of the Direct Linear Transform, A*h = 0
+
+    Input:
+    x1: 3xN set of homogeneous points (or a Mx3xN stack)
+    x2: 3xN set of homogeneous points such that x1<->x2 (or a Mx3xN stack)
+
+    Returns:
+    A: 2Nx9 matrix (Mx2Nx9 for stacks), rows 2i and 2i+1 are the two
+       independent equations of point i
+    """
+    x1 = np.asarray(x1, dtype=np.float64)
+    x2 = np.asarray(x2, dtype=np.float64)
+    Npts = x1.shape[-1]
+    stack = np.broadcast(x1[...,0,:], x2[...,0,:]).shape[:-1]
+
+    A = np.zeros(stack + (Npts, 2, 9))
+    X = np.swapaxes(x1, -1, -2)
+    x = x2[...,0,:,np.newaxis]
+    y = x2[...,1,:,np.newaxis]
+    w = x2[...,2,:,np.newaxis]
+    A[...,0,3:6] = -w*X
+    A[...,0,6:9] = y*X
+    A[...,1,0:3] = w*X
+    A[...,1,6:9] = -x*X
+    #the third equation [-y*X, x*X, O] is omitted since only two equations are independent
+
+    return A.reshape(stack + (2*Npts, 9))
+
+
 def normalise2dpts(pts):
     """
     Function translates and normalises a set of 2D homogeneous points
@@ -13,7 +13,7 @@ import matplotlib.pyplot as plt
 import error_functions as ef
 from ippe import homo2d
 
-from vision.camera import Camera
+from vision.camera import Camera, CompactCamera
 from vision.plane import Plane
 from vision.camera_distribution import plot3D, plot3D_cam
 
@@ -42,14 +42,17 @@ def run_single(cam, objectPoints, noise = 0, quant_error = False, plot = False,
     if noise:
       imagePoints = cam.addnoise_imagePoints(imagePoints, mean = 0, sd = noise)
 
+    #Compact copy of the camera, its clones share K and only store a new pose
+    compactCam = CompactCamera.from_camera(cam)
+
     #Calculate the pose using solvepnp
     pnp_tvec, pnp_rmat = pose_pnp(objectPoints, imagePoints, cam.K, debug, cv2.SOLVEPNP_ITERATIVE,False)
-    pnpCam = cam.clone_withPose(pnp_tvec, pnp_rmat)
+    pnpCam = compactCam.clone_withPose(pnp_tvec, pnp_rmat)
 
     #Calculate the pose using IPPE (solution with least repro error)
     normalizedimagePoints = cam.get_normalized_pixel_coordinates(imagePoints)
     ippe_tvec, ippe_rmat = pose_ippe_best(objectPoints, normalizedimagePoints, debug)
-    ippeCam = cam.clone_withPose(ippe_tvec, ippe_rmat)
+    ippeCam = compactCam.clone_withPose(ippe_tvec, ippe_rmat)
 
     #Calculate the pose using IPPE (both solutions)
     #ippe_tvec1,ippe_rmat1,ippe_tvec2,ippe_rmat2 = pose_ippe_both(objectPoints, normalizedimagePoints, debug)
@@ -91,7 +94,7 @@ def run_single(cam, objectPoints, noise = 0, quant_error = False, plot = False,
       #cams = [cam, ippeCam1, ippeCam2, pnpCam]
       #planes = [pl]
       #plot3D(cams, planes)
-    del imagePoints, pnp_tvec, pnp_rmat, pnpCam, normalizedimagePoints, ippe_tvec, ippe_rmat,ippeCam
+    del imagePoints, pnp_tvec, pnp_rmat, pnpCam, normalizedimagePoints, ippe_tvec, ippe_rmat,ippeCam, compactCam
 
 
     return ippe_tvec_error, ippe_rmat_error, pnp_tvec_error, pnp_rmat_error
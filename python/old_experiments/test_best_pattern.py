@@ -22,7 +22,6 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from mpl_toolkits.mplot3d import Axes3D
-from Rt_matrix_from_euler_t import R_matrix_from_euler_t
 from uniform_sphere import uniform_sphere
 
 def create_cam_distribution(cam = None, plane = None, deviation = 0, plot=False):
@@ -100,25 +99,22 @@ def create_cam_distribution(cam = None, plane = None, deviation = 0, plot=False)
     objectPoints = pl.get_points()
     #ax.scatter(objectPoints[0,:],objectPoints[1,:],objectPoints[2,:], color = 'r')
 
-  cams = []
-  for pl in pl_space:
-
-    cam = cam.clone()
-    cam.set_t(-pl.origin[0], -pl.origin[1],-pl.origin[2])
-    cam.set_R_mat(R_matrix_from_euler_t(0.0,0,0))
-    cam.look_at([0,0,0])
-
-    #
+  # one camera on every plane origin, all of them looking at the world origin
+  candidate_cams = CameraArray.from_look_at(cam.K, np.array([pl.origin for pl in pl_space]), np.zeros(3),
+                                            img_width = cam.img_width, img_height = cam.img_height, dist = cam.dist)
 
+  for pl in pl_space:
     pl.set_origin(np.array([0, 0, 0]))
     pl.uniform()
-    objectPoints = pl.get_points()
-    imagePoints = cam.project(objectPoints)
-    if plot:
-      cam.plot_image(imagePoints)
-    if ((imagePoints[0,:]<cam.img_width) & (imagePoints[0,:]>0)).all():
-      if ((imagePoints[1,:]<cam.img_height) & (imagePoints[1,:]>0)).all():
-        cams.append(cam)
+  objectPoints = pl.get_points()
+
+  if plot:
+    for candidate_cam in candidate_cams.to_cameras():
+      candidate_cam.plot_image(candidate_cam.project(objectPoints))
+
+  # keep the cameras that see the whole plane, all of them in one pass
+  visible = candidate_cams.visible_mask(objectPoints).all(axis=1)
+  cams = [candidate_cams[i] for i in np.flatnonzero(visible)]
 
   if plot:
     planes = []
@@ -4,25 +4,209 @@ from scipy.linalg import expm, rq, det, inv
 import matplotlib.pyplot as plt
 
 from math import atan
-from rt_matrix import rotation_matrix
+from rt_matrix import rotation_matrix, look_at_batch
+from sensor import SensorPipeline
 import autograd.numpy as np
 
 
+def _distortion_coefficients(dist):
+    """ Split a (...,5) array of [k1, k2, p1, p2, k3] coefficients (OpenCV order,
+    k3 may be omitted) into five arrays that broadcast against (...,N) rows """
+    dist = np.asarray(dist, dtype=np.float64)
+    d = np.zeros(dist.shape[:-1] + (5,))
+    d[...,:dist.shape[-1]] = dist
+    return [d[...,i,np.newaxis] for i in range(5)]
+
+def distort_points(x, dist):
+    """ Apply radial and tangential lens distortion to normalized points
+    x: (...,2,N) normalized image coordinates (extra rows are ignored)
+    dist: [k1, k2, p1, p2, k3] or a (...,5) stack matching the points
+    returns: (...,2,N) distorted normalized coordinates
+    """
+    k1, k2, p1, p2, k3 = _distortion_coefficients(dist)
+    x = np.asarray(x, dtype=np.float64)
+    u = x[...,0,:]
+    v = x[...,1,:]
+    r2 = u**2 + v**2
+    radial = 1 + r2*(k1 + r2*(k2 + r2*k3))
+    xd = np.empty(x.shape[:-2] + (2, x.shape[-1]))
+    xd[...,0,:] = u*radial + 2*p1*u*v + p2*(r2 + 2*u**2)
+    xd[...,1,:] = v*radial + p1*(r2 + 2*v**2) + 2*p2*u*v
+    return xd
+
+def undistort_points(xd, dist, iterations = 10):
+    """ Remove lens distortion from normalized points with a fixed number of
+    fixed-point iterations (the same scheme used by cv2.undistortPoints)
+    xd: (...,2,N) distorted normalized image coordinates
+    dist: [k1, k2, p1, p2, k3] or a (...,5) stack matching the points
+    returns: (...,2,N) undistorted normalized coordinates
+    """
+    k1, k2, p1, p2, k3 = _distortion_coefficients(dist)
+    xd = np.asarray(xd, dtype=np.float64)
+    ud = xd[...,0,:]
+    vd = xd[...,1,:]
+    u = ud.copy()
+    v = vd.copy()
+    for i in range(iterations):
+        r2 = u**2 + v**2
+        icdist = 1./(1 + r2*(k1 + r2*(k2 + r2*k3)))
+        delta_u = 2*p1*u*v + p2*(r2 + 2*u**2)
+        delta_v = p1*(r2 + 2*v**2) + 2*p2*u*v
+        u = (ud - delta_u)*icdist
+        v = (vd - delta_v)*icdist
+    return np.stack([u, v], axis=-2)
+
+def _apply_distortion_model(x, K, dist, model):
+    """ Run a distortion model defined on normalized coordinates over pixel
+    points x (...,2,N) or (...,3,N), K is a 3x3 or a (...,3,3) stack """
+    x = np.array(x, dtype=np.float64)
+    K = np.asarray(K, dtype=np.float64)
+    fx = K[...,0,0,np.newaxis]
+    s = K[...,0,1,np.newaxis]
+    cx = K[...,0,2,np.newaxis]
+    fy = K[...,1,1,np.newaxis]
+    cy = K[...,1,2,np.newaxis]
+    v = (x[...,1,:] - cy)/fy
+    u = (x[...,0,:] - cx - s*v)/fx
+    xn = model(np.stack([u, v], axis=-2), dist)
+    x[...,0,:] = fx*xn[...,0,:] + s*xn[...,1,:] + cx
+    x[...,1,:] = fy*xn[...,1,:] + cy
+    return x
+
+def rq_batch(M):
+    """ RQ decomposition M = K.R of a (...,3,3) stack, computed with a
+    Gram-Schmidt orthogonalization of the rows starting from the last one.
+    returns: K (...,3,3) upper triangular with positive diagonal and
+             R (...,3,3) orthonormal with det(R) = sign(det(M))
+    """
+    M = np.asarray(M, dtype=np.float64)
+    m1 = M[...,0,:]
+    m2 = M[...,1,:]
+    m3 = M[...,2,:]
+    K = np.zeros(M.shape)
+    R = np.empty(M.shape)
+
+    K[...,2,2] = np.linalg.norm(m3, axis=-1)
+    r3 = m3/K[...,2,2,np.newaxis]
+
+    K[...,1,2] = np.sum(m2*r3, axis=-1)
+    w2 = m2 - K[...,1,2,np.newaxis]*r3
+    K[...,1,1] = np.linalg.norm(w2, axis=-1)
+    r2 = w2/K[...,1,1,np.newaxis]
+
+    K[...,0,2] = np.sum(m1*r3, axis=-1)
+    K[...,0,1] = np.sum(m1*r2, axis=-1)
+    w1 = m1 - K[...,0,2,np.newaxis]*r3 - K[...,0,1,np.newaxis]*r2
+    K[...,0,0] = np.linalg.norm(w1, axis=-1)
+    r1 = w1/K[...,0,0,np.newaxis]
+
+    R[...,0,:] = r1
+    R[...,1,:] = r2
+    R[...,2,:] = r3
+    return K, R
+
+def factor_projection_matrices(P):
+    """ Factorize a stack of camera matrices into K,R,t as P = s.K[R|t].
+    P is only defined up to scale, the sign of each matrix is chosen so that
+    det(R) = +1, the diagonal of K is positive and K is normalized (K[2,2] = 1).
+    P: Mx3x4 (or a single 3x4) stack of projection matrices
+    returns: K Mx3x3, R Mx3x3, t Mx3
+    """
+    P = np.asarray(P, dtype=np.float64)
+    sign = np.sign(np.linalg.det(P[...,:3]))
+    P = P*sign[...,np.newaxis,np.newaxis]
+    K, R = rq_batch(P[...,:3])
+    t = np.linalg.solve(K, P[...,3:4])[...,0]
+    K = K/K[...,2:3,2:3]
+    return K, R, t
+
+
 class Camera(object):
-    """ Class for representing pin-hole cameras. """
+    """ Class for representing pin-hole cameras.
+
+    Rt, P, the world position and the homography of the plane z=0 are
+    derived from K, R and t. They are cached and only recomputed when K, R
+    or t are assigned again, so these matrices should be replaced through
+    the setters instead of being modified in place.
+    """
     def __init__(self):
         """ Initialize P = K[R|t] camera model. """
-        self.P = np.eye(3,4)
         self.K = np.eye(3, dtype=np.float32) # calibration matrix
         self.R = np.eye(4, dtype=np.float32) # rotation
         self.t = np.eye(4, dtype=np.float32) # translation
-        self.Rt = np.eye(4, dtype=np.float32)
         self.fx = 1.
         self.fy = 1.
         self.cx = 0.
         self.cy = 0.
         self.img_width = 1280
         self.img_height = 960
+        self.dist = np.zeros(5) # distortion coefficients k1, k2, p1, p2, k3
+        self.sensor = SensorPipeline() # used by observe()
+
+    @property
+    def K(self):
+        return self._K
+
+    @K.setter
+    def K(self, K):
+        self._K = K
+        self._P = None
+        self._H = None
+
+    @property
+    def R(self):
+        return self._R
+
+    @R.setter
+    def R(self, R):
+        self._R = R
+        self.invalidate_pose()
+
+    @property
+    def t(self):
+        return self._t
+
+    @t.setter
+    def t(self, t):
+        self._t = t
+        self.invalidate_pose()
+
+    @property
+    def Rt(self):
+        if self._Rt is None:
+            self._Rt = _readonly(np.dot(self._t, self._R))
+        return self._Rt
+
+    @Rt.setter
+    def Rt(self, Rt):
+        # Keep R and t consistent with the new [R|t]
+        R = np.eye(4)
+        R[:3,:3] = Rt[:3,:3]
+        t = np.eye(4)
+        t[:3,3] = Rt[:3,3]
+        self._R = R
+        self._t = t
+        self.invalidate_pose()
+        self._Rt = Rt
+
+    @property
+    def P(self):
+        if self._P is None:
+            self.set_P()
+        return self._P
+
+    @P.setter
+    def P(self, P):
+        # An explicit P is kept until K, R or t change
+        self._P = P
+        self._H = None
+
+    def invalidate_pose(self):
+        """ Drop the cached quantities that depend on the pose """
+        self._Rt = None
+        self._P = None
+        self._H = None
+        self._world_position = None
 
     def clone_withPose(self, tvec, rmat):
         new_cam = Camera()
@@ -32,6 +216,8 @@ class Camera(object):
         new_cam.set_P()
         new_cam.img_height = self.img_height
         new_cam.img_width = self.img_width
+        new_cam.dist = self.dist
+        new_cam.sensor = self.sensor.copy()
         return new_cam
 
     def clone(self):
@@ -47,6 +233,8 @@ class Camera(object):
         new_cam.cy = self.cy
         new_cam.img_height = self.img_height
         new_cam.img_width = self.img_width
+        new_cam.dist = self.dist
+        new_cam.sensor = self.sensor.copy()
         return new_cam
 
 
@@ -54,7 +242,7 @@ class Camera(object):
         # P = K[R|t]
         # P is a 3x4 Projection Matrix (from 3d euclidean to image)
         #self.Rt = hstack((self.R, self.t))
-        self.P = np.dot(self.K, self.Rt[:3,:4])
+        self._P = _readonly(np.dot(self.K, self.Rt[:3,:4]))
 
     def set_K(self, fx = 1, fy = 1, cx = 0,cy = 0):
         # K is the 3x3 Camera matrix
@@ -67,15 +255,42 @@ class Camera(object):
         self.K = np.mat([[fx, 0, cx],
                       [0,fy,cy],
                       [0,0,1.]], dtype=np.float32)
-        self.set_P()
+
+    def set_K_mat(self, K):
+        # full 3x3 Camera matrix, keeps the skew term that set_K drops
+        K = np.mat(K, dtype=np.float64)
+        self.fx = K[0,0]
+        self.fy = K[1,1]
+        self.cx = K[0,2]
+        self.cy = K[1,2]
+        self.K = K
+
+    def set_distortion(self, k1 = 0, k2 = 0, p1 = 0, p2 = 0, k3 = 0):
+        # k1, k2, k3 are radial and p1, p2 tangential distortion coefficients
+        # (same convention as OpenCV)
+        self.dist = np.array([k1, k2, p1, p2, k3], dtype=np.float64)
+
+    def distort(self, imagePoints):
+        """ Apply the lens distortion to ideal pin-hole image points
+        imagePoints: 2xn/3xn points in pixel coordinates or a Mx2xn/Mx3xn stack
+        returns: a distorted copy of the points
+        """
+        return _apply_distortion_model(imagePoints, self.K, self.dist, distort_points)
+
+    def undistort(self, imagePoints, iterations = 10):
+        """ Remove the lens distortion from measured image points
+        imagePoints: 2xn/3xn points in pixel coordinates or a Mx2xn/Mx3xn stack
+        returns: an undistorted copy of the points
+        """
+        model = lambda x, dist: undistort_points(x, dist, iterations)
+        return _apply_distortion_model(imagePoints, self.K, self.dist, model)
 
     def set_width_heigth(self,width, heigth):
         self.img_width = width
         self.img_height = heigth
 
     def update_Rt(self):
-        self.Rt = np.dot(self.t,self.R)
-        self.set_P()
+        self.invalidate_pose()
 
     def set_R_axisAngle(self,x,y,z, alpha):
         """  Creates a 3D [R|t] matrix for rotation
@@ -114,17 +329,23 @@ class Camera(object):
         camera's intrinsic matrix and lens distortion are corrected, so that
         the Q projects with a perfect pinhole model.
         """
+        if np.any(self.dist):
+            X = self.undistort(X)
         return np.dot(inv(self.K), X)
 
-    def addnoise_imagePoints(self, imagePoints, mean = 0, sd = 2):
+    def addnoise_imagePoints(self, imagePoints, mean = 0, sd = 2, rng = None):
         """ Add Gaussian noise to image points
         imagePoints: 3xn points in homogeneous pixel coordinates
         mean: zero mean
         sd: pixels of standard deviation
+        rng: optional random generator (e.g. from vision.noise.NoiseStreams),
+             the global numpy random state is used by default
         """
         imagePoints = np.copy(imagePoints)
+        if rng is None:
+            rng = np.random
         if sd > 0:
-            gaussian_noise = np.random.normal(mean,sd,(2,imagePoints.shape[1]))
+            gaussian_noise = rng.normal(mean,sd,(2,imagePoints.shape[1]))
             imagePoints[:2,:] = imagePoints[:2,:] + gaussian_noise
         return imagePoints
 
@@ -133,20 +354,53 @@ class Camera(object):
         return tvec
 
     def get_world_position(self):
-        t = np.dot(inv(self.Rt), np.array([0,0,0,1]))
-        return t
+        if self._world_position is None:
+            Rt = np.asarray(self.Rt)
+            # inverse of [R|t] applied to the origin: -R^T t
+            self._world_position = _readonly(np.append(-np.dot(Rt[:3,:3].T, Rt[:3,3]), 1.))
+        return self._world_position
 
 
-    def project(self,X, quant_error=False):
-        """  Project points in X (4*n array) and normalize coordinates. """
-        self.set_P()
-        x = np.dot(self.P,X)
-        for i in range(x.shape[1]):
-          x[:,i] /= x[2,i]
+    def project(self,X, quant_error=False, out=None, P=None):
+        """  Project points in X (4*n array) and normalize coordinates.
+        out: optional 3*n float64 array where the image points are written
+        P: optional 3x4 projection matrix used instead of self.P
+        """
+        if P is None:
+            P = self.P
+        if out is None:
+            x = np.dot(P,X)
+        else:
+            x = np.dot(np.asarray(P), np.asarray(X), out=out)
+        x[:2] /= x[2]
+        x[2] /= x[2]
+        if np.any(self.dist):
+            x[:2] = self.distort(np.asarray(x[:2]))
         if(quant_error):
-            x = np.around(x, decimals=0)
+            np.around(x, decimals=0, out=x)
         return x
 
+    def observe(self, X, sensor = None, rng = None):
+        """ Project the points in X (4*n array) and run them through the
+        sensor pipeline (self.sensor by default)
+        returns: 3xn measured image points and a boolean mask of the valid ones
+        """
+        if sensor is None:
+            sensor = self.sensor
+        X = np.asarray(X)
+        depth = np.dot(np.asarray(self.Rt)[2], X)
+        x = np.asarray(self.project(X))
+        return sensor.apply(x, self.img_width, self.img_height, depth, rng, out=x)
+
+    def visible_mask(self, X):
+        """ Boolean mask of the points in X (4*n array) that are in front of
+        the camera and project strictly inside the image """
+        X = np.asarray(X)
+        depth = np.dot(np.asarray(self.Rt)[2], X)
+        x = np.asarray(self.project(X))
+        return ((depth > 0) & (x[0] > 0) & (x[0] < self.img_width)
+                & (x[1] > 0) & (x[1] < self.img_height))
+
     def project_circle(self, circle):
         C = circle.get_C
         H = self.homography_from_Rt()
@@ -183,10 +437,13 @@ class Camera(object):
         T = np.diag(np.sign(np.diag(K)))
         if det(T) < 0:
             T[1,1] *= -1
-        self.K = np.dot(K,T)
-        self.R = np.dot(T,R) # T is its own inverse
-        self.t = np.dot(inv(self.K),self.P[:,3])
-        return self.K, self.R, self.t
+        K = np.dot(K,T)
+        R = np.dot(T,R) # T is its own inverse
+        t = np.dot(inv(K),self.P[:,3])
+        self.K = K
+        # store R and t as homogeneous matrices so that K[R|t] == P
+        self.Rt = np.vstack((np.column_stack((R, t)), [0, 0, 0, 1]))
+        return K, R, t
 
     def fov(self):
         """ Calculate field of view angles (grads) from camera matrix """
@@ -204,18 +461,11 @@ class Camera(object):
         R = rotation_matrix(axis, angle)
         newR = np.dot(R,self.R)
         self.Rt = np.dot(self.t, newR)
-        self.R[:3,:3] = self.Rt[:3,:3]
-        self.t[:3,3] = self.Rt[:3,3]
-        self.set_P()
 
     def rotate(self, axis, angle):
         """ rotate camera around a given axis in world coordinates"""
         R = rotation_matrix(axis, angle)
         self.Rt = np.dot(R, self.Rt)
-        self.R[:3,:3] = self.Rt[:3,:3]
-        self.t[:3,3] = self.Rt[:3,3]
-        # DO NOT forget to set new P
-        self.set_P()
 
     def rotate_x(self,angle):
         self.rotate(np.array([1,0,0],dtype=np.float32), angle)
@@ -227,45 +477,253 @@ class Camera(object):
         self.rotate(np.array([0,0,1],dtype=np.float32), angle)
 
     def look_at(self, world_position):
-      #%%
-      world_position = self.get_world_position()[:3]
-      eye = world_position
-      target = np.array([0,0,0])
-      up = np.array([0,1,0])
+      """ Rotate the camera, keeping its position, so that its z axis points
+      to world_position (x,y,z in world coordinates) """
+      eye = self.get_world_position()[:3]
+      R, Rt = look_at_batch(eye, world_position)
+      # the Rt setter also updates R and t
+      self.Rt = Rt[0]
+
+    def homography_from_Rt(self):
+      if self._H is None:
+        rt_reduced = self.Rt[:3,[0,1,3]]
+        H = np.dot(self.K,rt_reduced)
+        if H[2,2] != 0.:
+          H = H/H[2,2]
+        self._H = _readonly(H)
+      return self._H
+
+
+def _readonly(a):
+    """ Mark a cached array read-only so that it can be returned by reference """
+    a.flags.writeable = False
+    return a
+
+def _frozen(a, shape):
+    """ float64 read-only copy of a, so that it can be shared between clones """
+    a = np.array(a, dtype=np.float64).reshape(shape)
+    a.flags.writeable = False
+    return a
+
+
+class CompactCamera(object):
+    """ Compact pin-hole camera for large numbers of poses.
+
+    The pose is stored as a 3x3 rotation matrix and a translation 3-vector in
+    float64. The arrays are read-only, so clones share them instead of copying
+    and the homogeneous 4x4 matrices used by Camera are only built on request.
+
+    Parameters:
+        K: 3x3 calibration matrix
+        rmat: 3x3 (or 4x4 homogeneous) rotation matrix
+        tvec: translation vector (3 or 4 homogeneous elements)
+    """
+    __slots__ = ('K', 'rmat', 'tvec', 'dist', 'img_width', 'img_height')
+
+    def __init__(self, K = np.eye(3), rmat = np.eye(3), tvec = np.zeros(3), img_width = 1280, img_height = 960, dist = np.zeros(5)):
+        self.K = _frozen(K, (3,3))
+        self.rmat = _frozen(np.asarray(rmat)[:3,:3], (3,3))
+        self.tvec = _frozen(np.asarray(tvec).ravel()[:3], (3,))
+        self.dist = _frozen(dist, (5,))
+        self.img_width = img_width
+        self.img_height = img_height
+
+    @classmethod
+    def from_camera(cls, cam):
+        Rt = np.asarray(cam.Rt)
+        return cls(cam.K, Rt[:3,:3], Rt[:3,3], cam.img_width, cam.img_height, cam.dist)
+
+    def to_camera(self):
+        cam = Camera()
+        cam.set_K_mat(self.K)
+        cam.set_R_mat(self.R)
+        cam.set_t(self.tvec[0], self.tvec[1], self.tvec[2])
+        cam.set_width_heigth(self.img_width, self.img_height)
+        cam.dist = np.array(self.dist)
+        return cam
+
+    def clone(self):
+        new_cam = CompactCamera.__new__(CompactCamera)
+        for name in CompactCamera.__slots__:
+            setattr(new_cam, name, getattr(self, name))
+        return new_cam
 
-      zaxis = (target-eye)/np.linalg.norm(target-eye)
-      xaxis = (np.cross(up,zaxis))/np.linalg.norm(np.cross(up,zaxis))
-      yaxis = np.cross(zaxis, xaxis)
+    def clone_withPose(self, tvec, rmat):
+        new_cam = self.clone()
+        new_cam.set_pose(tvec, rmat)
+        return new_cam
 
-      R = np.eye(4)
-      R = np.array([[xaxis[0], yaxis[0], zaxis[0], 0],
-                   [xaxis[1], yaxis[1], zaxis[1], 0],
-                   [xaxis[2], yaxis[2], zaxis[1], 0],
-                   [       0,        0,        0, 1]]
-          )
+    def set_pose(self, tvec, rmat):
+        self.rmat = _frozen(np.asarray(rmat)[:3,:3], (3,3))
+        self.tvec = _frozen(np.asarray(tvec).ravel()[:3], (3,))
 
-      R = np.array([[xaxis[0], xaxis[1], xaxis[2], 0],
-                   [yaxis[0], yaxis[1], yaxis[2], 0],
-                   [zaxis[0], zaxis[1], zaxis[2], 0],
-                   [       0,        0,        0, 1]])
+    def get_tvec(self):
+        """ Homogeneous translation vector, same layout as Camera.get_tvec """
+        return np.append(self.tvec, 1.)
 
+    def get_world_position(self):
+        return np.append(-np.dot(self.rmat.T, self.tvec), 1.)
 
-      t = np.eye(4, dtype=np.float32) # translation
-      t[:3,3] = -eye
+    @property
+    def R(self):
+        """ 4x4 homogeneous rotation matrix """
+        R = np.eye(4)
+        R[:3,:3] = self.rmat
+        return R
+
+    @property
+    def t(self):
+        """ 4x4 homogeneous translation matrix """
+        t = np.eye(4)
+        t[:3,3] = self.tvec
+        return t
 
-      self.R = R
+    @property
+    def Rt(self):
+        Rt = np.eye(4)
+        Rt[:3,:3] = self.rmat
+        Rt[:3,3] = self.tvec
+        return Rt
 
+    @property
+    def P(self):
+        return np.dot(self.K, np.column_stack((self.rmat, self.tvec)))
 
-      self.Rt = np.dot(R,t)
-      self.t = np.eye(4, dtype=np.float32)
-      self.t[:3,3] = self.Rt[:3,3]
+    def project(self, X, quant_error=False, out=None):
+        """  Project points in X (4*n array) and normalize coordinates. """
+        x = np.dot(self.P, np.asarray(X), out=out)
+        x[:2] /= x[2]
+        x[2] /= x[2]
+        if np.any(self.dist):
+            x[:2] = _apply_distortion_model(x[:2], self.K, self.dist, distort_points)
+        if(quant_error):
+            np.around(x, decimals=0, out=x)
+        return x
 
     def homography_from_Rt(self):
-      rt_reduced = self.Rt[:3,[0,1,3]]
-      H = np.dot(self.K,rt_reduced)
-      if H[2,2] != 0.:
-        H = H/H[2,2]
-      return H
+        H = np.dot(self.K, np.column_stack((self.rmat[:,:2], self.tvec)))
+        if H[2,2] != 0.:
+            H = H/H[2,2]
+        return H
+
+
+class CameraArray(object):
+    """ Class for representing a stack of M pin-hole cameras.
+
+    The cameras are stored as a structure of arrays so that a set of points
+    can be projected through all the poses in a single call.
+
+    Parameters:
+        K: Mx3x3 stack of calibration matrices (a single 3x3 is broadcasted)
+        Rt: Mx3x4 (or Mx4x4) stack of [R|t] matrices
+        img_width, img_height: image size in pixels, scalar or one per camera
+        dist: distortion coefficients [k1, k2, p1, p2, k3], shared or Mx5
+    """
+    def __init__(self, K, Rt, img_width = 1280, img_height = 960, dist = np.zeros(5)):
+        Rt = np.asarray(Rt, dtype=np.float64)
+        if Rt.ndim == 2:
+            Rt = Rt[np.newaxis]
+        self.Rt = np.ascontiguousarray(Rt[:,:3,:4])
+        M = self.Rt.shape[0]
+        K = np.asarray(K, dtype=np.float64)
+        self.K = np.ascontiguousarray(np.broadcast_to(K, (M,3,3)))
+        self.img_width = np.broadcast_to(np.asarray(img_width), (M,)).copy()
+        self.img_height = np.broadcast_to(np.asarray(img_height), (M,)).copy()
+        self.dist = np.broadcast_to(np.asarray(dist, dtype=np.float64), (M,5)).copy()
+
+    @classmethod
+    def from_cameras(cls, cams):
+        """ Stack a list of Camera objects into a CameraArray """
+        K = np.array([np.asarray(cam.K) for cam in cams], dtype=np.float64)
+        Rt = np.array([np.asarray(cam.Rt)[:3,:4] for cam in cams], dtype=np.float64)
+        img_width = [cam.img_width for cam in cams]
+        img_height = [cam.img_height for cam in cams]
+        dist = [cam.dist for cam in cams]
+        return cls(K, Rt, img_width, img_height, dist)
+
+    @classmethod
+    def from_look_at(cls, K, eyes, target = np.zeros(3), up = np.array([0., 1., 0.]), img_width = 1280, img_height = 960, dist = np.zeros(5)):
+        """ Stack of cameras placed at eyes (Mx3 world positions) looking at target """
+        R, Rt = look_at_batch(eyes, target, up)
+        return cls(K, Rt, img_width, img_height, dist)
+
+    @classmethod
+    def from_projection_matrices(cls, P, img_width = 1280, img_height = 960, dist = np.zeros(5)):
+        """ Stack of cameras recovered from Mx3x4 projection matrices """
+        K, R, t = factor_projection_matrices(P)
+        return cls(K, np.concatenate((R, t[...,np.newaxis]), axis=-1), img_width, img_height, dist)
+
+    def __len__(self):
+        return self.Rt.shape[0]
+
+    def __getitem__(self, i):
+        """ Split the i-th camera out of the stack as a Camera object """
+        K = self.K[i]
+        cam = Camera()
+        cam.set_K_mat(K)
+        R = np.eye(4)
+        R[:3,:3] = self.Rt[i,:,:3]
+        cam.set_R_mat(R)
+        cam.set_t(self.Rt[i,0,3], self.Rt[i,1,3], self.Rt[i,2,3])
+        cam.set_width_heigth(int(self.img_width[i]), int(self.img_height[i]))
+        cam.dist = self.dist[i].copy()
+        return cam
+
+    def to_cameras(self):
+        return [self[i] for i in range(len(self))]
+
+    @property
+    def P(self):
+        """ Mx3x4 stack of projection matrices P = K[R|t] """
+        return np.matmul(self.K, self.Rt)
+
+    def factor(self):
+        """ Factorize the camera matrices into K,R,t stacks, see
+        factor_projection_matrices """
+        return factor_projection_matrices(self.P)
+
+    def project(self, X, quant_error=False, out=None):
+        """  Project points in X (4*n array) through every camera of the stack.
+        out: optional Mx3xn float64 array where the image points are written
+        returns: Mx3xn array of normalized image points """
+        x = np.matmul(self.P, np.asarray(X), out=out)
+        x[:,:2] /= x[:,2:3]
+        x[:,2] /= x[:,2]
+        if np.any(self.dist):
+            x[:,:2] = self.distort(x[:,:2])
+        if(quant_error):
+            np.around(x, decimals=0, out=x)
+        return x
+
+    def observe(self, X, sensor, rng = None):
+        """ Project the points in X (4*n array) through every camera and run
+        them through a SensorPipeline
+        returns: Mx3xn measured image points and a Mxn mask of the valid ones
+        """
+        X = np.asarray(X)
+        depth = np.matmul(self.Rt[:,2,:], X)
+        x = self.project(X)
+        return sensor.apply(x, self.img_width, self.img_height, depth, rng, out=x)
+
+    def visible_mask(self, X):
+        """ Mxn boolean mask of the points in X (4*n array) that are in front
+        of each camera and project strictly inside its image """
+        X = np.asarray(X)
+        depth = np.matmul(self.Rt[:,2,:], X)
+        x = self.project(X)
+        width = self.img_width[:,np.newaxis]
+        height = self.img_height[:,np.newaxis]
+        return ((depth > 0) & (x[:,0] > 0) & (x[:,0] < width)
+                & (x[:,1] > 0) & (x[:,1] < height))
+
+    def distort(self, imagePoints):
+        """ Apply the lens distortion of each camera to a Mx2xn/Mx3xn stack """
+        return _apply_distortion_model(imagePoints, self.K, self.dist, distort_points)
+
+    def undistort(self, imagePoints, iterations = 10):
+        """ Remove the lens distortion of each camera from a Mx2xn/Mx3xn stack """
+        model = lambda x, dist: undistort_points(x, dist, iterations)
+        return _apply_distortion_model(imagePoints, self.K, self.dist, model)
 
       #%%
 #cam = Camera()
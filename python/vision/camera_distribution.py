@@ -11,9 +11,8 @@ from mayavi import mlab
 from numpy import random, cos, sin, sqrt, pi, linspace, deg2rad, meshgrid
 from mpl_toolkits.mplot3d import Axes3D
 
-from vision.camera import Camera
+from vision.camera import Camera, CameraArray
 from vision.plane import Plane
-from vision.rt_matrix import R_matrix_from_euler_t
 
 
 def uniform_sphere(theta_params = (0,360,10), phi_params = (0,90,10), r = 1., plot = False):
@@ -96,23 +95,17 @@ def create_cam_distribution(cam = None, plane_size = (0.3,0.3), theta_params = (
       t_list.append(sphere_points)      
   t_space = np.hstack(t_list)
 
-  cams = []
-  for t in t_space.T:
-    cam = cam.clone()
-    cam.set_t(-t[0], -t[1],-t[2])
-    cam.set_R_mat(R_matrix_from_euler_t(0.0,0,0))
-    cam.look_at([0,0,0])
+  # one camera on every sphere point, all of them looking at the plane center
+  candidate_cams = CameraArray.from_look_at(cam.K, t_space.T, np.zeros(3),
+                                            img_width = cam.img_width, img_height = cam.img_height, dist = cam.dist)
 
-    plane.set_origin(np.array([0, 0, 0]))
-    plane.uniform()
-    objectPoints = plane.get_points()
-    imagePoints = cam.project(objectPoints)
-    
-    #if plot:
-    #  cam.plot_image(imagePoints)
-    if ((imagePoints[0,:]<cam.img_width) & (imagePoints[0,:]>0)).all():
-      if ((imagePoints[1,:]<cam.img_height) & (imagePoints[1,:]>0)).all():
-        cams.append(cam)
+  plane.set_origin(np.array([0, 0, 0]))
+  plane.uniform()
+  objectPoints = plane.get_points()
+
+  # keep the cameras that see the whole plane, all of them in one pass
+  visible = candidate_cams.visible_mask(objectPoints).all(axis=1)
+  cams = [candidate_cams[i] for i in np.flatnonzero(visible)]
 
   if plot:
     planes = []
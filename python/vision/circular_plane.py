@@ -7,10 +7,12 @@ Created on Fri May 12 11:04:45 2017
 """
 import autograd.numpy as np
 from vision.rt_matrix import *
+from vision.sampling import poisson_disk_batch, sample_cells, plane_layouts
+from vision.posed_points import PosedPoints
 from vision.conics import Circle
 import matplotlib.pyplot as plt
 
-class CircularPlane(object):
+class CircularPlane(PosedPoints):
     """ Class for representing a 3D grid plane based on a point and a normal.
 
     Parameters:
@@ -31,6 +33,7 @@ class CircularPlane(object):
         self.size = (2.*radius,2.*radius)
         self.type = 'circular'
         self.circle = Circle((origin[0],origin[1]), radius)
+        self.cells_cache = {}
 
     def clone(self):
         new_plane = CircularPlane()
@@ -53,71 +56,95 @@ class CircularPlane(object):
 #                            [1,  1,  1,  1]])
 #        return corners
 
-    def random(self, n = 4, r = 0.05, min_sep = 0.01):
+    def candidate_cells(self, r = 0.05, min_sep = 0.01):
         """
-        n: ammount of features on the plane
+        Centers of the cells of an equally spaced grid over the circular plane.
+        The pitch of the grid is r + min_sep/2, only the cells whose center is
+        inside the circle are kept.
         r: radius of each feature (not inluding white borders for detection)
-        min_sep: minimum distance from the border of the circle to assure detection
-        """
-
-        """
-        This method is a little bit brute force approach. It is based on the Plane class.
-        We first create a square of size RxR, in this square we create a grid, each cell of this
-        grid has the size of a feature plus its min_separation between features.
-        Then we randomly select a cell, if the center of the cell is inside the circle then
-        we assigne a point to that cell. We continue with the same procedure for all the required poitns.
+        min_sep: half of it is added to r to get the pitch of the cell grid,
+                 every feature takes a different cell so the feature centers
+                 are at least r + min_sep/2 apart (features of radius r may
+                 overlap, random_poisson keeps 2r + min_sep between centers)
+        returns: 2xk array of cell centers (without the plane origin), the grid
+        is computed once for each radius, r and min_sep
         """
+        key = (self.radius, r, min_sep)
+        if key not in self.cells_cache:
+            cell_size = r + min_sep/2.0
 
-        # create a equally spaced grid. Each cell with the size of a feature plus its min_separation
-        cell_size = r + min_sep/2.0
+            grid_size_RxR = int(round((self.radius*2)/cell_size))+1
 
-        grid_size_RxR = int(round((self.radius*2)/cell_size))+1
+            xy_pos = np.arange(grid_size_RxR, dtype=np.float64)*cell_size
 
+            # center the grid
+            xy_pos = xy_pos - xy_pos[-1]/2.
 
-        xy_range = range(grid_size_RxR)
+            xx, yy = np.meshgrid(xy_pos, xy_pos, indexing='ij')
+            inside = np.sqrt(xx**2+yy**2) <= self.radius
+            self.cells_cache[key] = np.array([xx[inside], yy[inside]])
+        return self.cells_cache[key]
 
+    def random(self, n = 4, r = 0.05, min_sep = 0.01):
+        """
+        n: ammount of features on the plane
+        r: radius of each feature (not inluding white borders for detection)
+        min_sep: spacing of the cell grid, see candidate_cells
+        """
 
-        x_pos = np.array(xy_range, dtype=np.float64)*cell_size
-        y_pos = np.array(xy_range, dtype=np.float64)*cell_size
-
-        # center the grid
-        x_pos = x_pos - x_pos[-1]/2.
-        y_pos = y_pos - y_pos[-1]/2.
-
-        #we create a boolean array
-        # True means available
-        available_grid = np.ones((grid_size_RxR, grid_size_RxR), dtype=bool)
-
-        #Now we want to allocate the random points on the grid
-
-        #we select an x,y position on the grid at random
-        # and check if we already have a point there
+        """
+        We first create a square of size RxR, in this square we create a grid, the pitch of this
+        grid is r + min_sep/2.
+        Only the cells whose center is inside the circle are candidates, the n cells
+        of the features are drawn from them at once without replacement.
+        """
+        cells = self.candidate_cells(r, min_sep)
+        if n > cells.shape[1]:
+            raise ValueError("Only %d features of radius %s fit on the plane" % (cells.shape[1], r))
+        selected = np.random.choice(cells.shape[1], n, replace=False)
 
         self.plane_points = np.zeros((4,n), dtype=np.float64)
-
-        for i in range(n):
-            from random import randint
-            point_placed = False
-            while not point_placed:
-                x_grid_candidate = randint(0, grid_size_RxR-1)
-                y_grid_candidate = randint(0, grid_size_RxR-1)
-
-                if(available_grid[x_grid_candidate,y_grid_candidate]):
-                    if self.inside_circle(x_pos[x_grid_candidate],y_pos[y_grid_candidate]):
-                        self.plane_points[0,i] = x_pos[x_grid_candidate]
-                        self.plane_points[1,i] = y_pos[y_grid_candidate]
-                        self.plane_points[2,i] = 0
-                        self.plane_points[3,i] = 1
-                        available_grid[x_grid_candidate,y_grid_candidate] = False
-                        point_placed = True
-                    else:
-                        available_grid[x_grid_candidate,y_grid_candidate] = False
+        self.plane_points[:2] = cells[:,selected]
+        self.plane_points[3] = 1
 
         # translate
         self.plane_points[0] += self.origin[0]
         self.plane_points[1] += self.origin[1]
         self.plane_points[2] += self.origin[2]
 
+    def random_batch(self, M, n = 4, r = 0.05, min_sep = 0.01, rng = None):
+        """
+        M independent random layouts of the features on the plane in one call
+        M: ammount of layouts
+        n: ammount of features on each layout
+        r: radius of each feature (not inluding white borders for detection)
+        min_sep: spacing of the cell grid, see candidate_cells
+        rng: random generator, the global numpy random state is used by default
+        returns: Mx4xn array of homogeneous plane points
+        """
+        xy = sample_cells(self.candidate_cells(r, min_sep), M, n, rng)
+        return plane_layouts(xy, self.origin)
+
+    def random_poisson(self, n = 4, r = 0.05, min_sep = 0.01, rng = None):
+        """
+        Random features placed with Poisson-disk (blue noise) sampling in
+        continuous coordinates, the borders of any two features are at least
+        min_sep apart
+        n: ammount of features on the plane
+        r: radius of each feature (not inluding white borders for detection)
+        min_sep: minimum distance between the borders of two features
+        rng: random generator, the global numpy random state is used by default
+        """
+        self.plane_points = self.random_poisson_batch(1, n, r, min_sep, rng)[0]
+
+    def random_poisson_batch(self, M, n = 4, r = 0.05, min_sep = 0.01, rng = None):
+        """
+        M independent Poisson-disk layouts, see random_poisson
+        returns: Mx4xn array of homogeneous plane points
+        """
+        xy = poisson_disk_batch(M, n, (-self.radius, -self.radius), (self.radius, self.radius), 2*r + min_sep, lambda x, y: x**2 + y**2 <= self.radius**2, rng = rng)
+        return plane_layouts(xy, self.origin)
+
     def inside_circle(self,x,y):
         """ Returns true if the coordinates defined by x,y are
         inside the circular plane """
@@ -144,29 +171,6 @@ class CircularPlane(object):
     def set_color(self,color):
         self.color = color
 
-    def rotate(self, axis, angle):
-        """ rotate plane points around a given axis in world coordinates"""
-        self.plane_points[0] -= self.origin[0]
-        self.plane_points[1] -= self.origin[1]
-        self.plane_points[2] -= self.origin[2]
-
-        R = rotation_matrix(axis, angle)
-        self.plane_points = np.dot(R, self.plane_points)
-
-        # return translation
-        self.plane_points[0] += self.origin[0]
-        self.plane_points[1] += self.origin[1]
-        self.plane_points[2] += self.origin[2]
-
-    def rotate_x(self,angle):
-        self.rotate(np.array([1,0,0],dtype=np.float32), angle)
-
-    def rotate_y(self,angle):
-        self.rotate(np.array([0,1,0],dtype=np.float32), angle)
-
-    def rotate_z(self,angle):
-        self.rotate(np.array([0,0,1],dtype=np.float32), angle)
-
     def plot_points(self):
         # show Image
         # plot projection
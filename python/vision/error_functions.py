@@ -6,14 +6,11 @@ Created on Wed Aug  2 14:58:01 2017
 @author: lracuna
 """
 import autograd.numpy as np
+from ippe.homo2d import dlt_matrix, homography2d
+from vision.rotation_metrics import rotation_error, geodesic_angle
 
 def validation_points_error(Xi, Xo, Hestimated):
-    Xi = np.copy(Xi)
-    Xo = np.copy(Xo)
-    sum = 0
-    for i in range(Xo.shape[1]):
-        sum += geometric_distance(Xo[:,i],Xi[:,i],Hestimated)
-    return sum/Xo.shape[1]
+    return geometric_distance_residuals(Xo, Xi, Hestimated)[1]
 
 def homography_matrix_error(Htrue, Hestimated):
     return np.sqrt(np.sum((Htrue - Hestimated)**2))
@@ -49,6 +46,38 @@ def transfer_error(Xo,Xi,H):
   H = np.copy(H)
   return d(Xi,np.dot(H,Xo))
 
+def homography_errors_batch(H, Xo, Xi, Href):
+  """Errors of a stack of homographies against one validation set, computed
+  with broadcasting (same definitions as transfer_error, sym_transfer_error
+  and homography_matrix_error)
+  H: Mx3x3 stack of estimated homographies
+  Xo: Object points in 2D Homogeneous Coordinates (3xn)
+  Xi: Image points in 2D Homogeneous Coordinates (3xn)
+  Href: reference 3x3 homography
+  returns: transfer errors, symmetric transfer errors and Frobenius errors (M arrays)
+  """
+  H = np.asarray(H)
+  Xo = np.asarray(Xo)
+  Xi = np.asarray(Xi)
+  xo = Xo[:2]/Xo[2]
+  xi = Xi[:2]/Xi[2]
+
+  HXo = np.matmul(H, Xo)
+  error1 = np.sqrt(np.sum((xi - HXo[:,:2]/HXo[:,2:])**2, axis=(1,2)))
+  HinvXi = np.matmul(np.linalg.inv(H), Xi)
+  error2 = np.sqrt(np.sum((xo - HinvXi[:,:2]/HinvXi[:,2:])**2, axis=(1,2)))
+
+  frobenius = np.sqrt(np.sum((np.asarray(Href) - H)**2, axis=(1,2)))
+  return error1, error1 + error2, frobenius
+
+def validation_points_error_batch(Xi, Xo, H):
+  """validation_points_error of a Mx3x3 stack of homographies (M array)"""
+  Xo = np.asarray(Xo)
+  Xi = np.asarray(Xi)
+  HXo = np.matmul(np.asarray(H), Xo)
+  residuals = np.sqrt(np.sum((Xi[:2]/Xi[2] - HXo[:,:2]/HXo[:,2:])**2, axis=1))
+  return np.mean(residuals, axis=1)
+
 def algebraic_distance(Xo,Xi,H):
   """
   Xi point measured in the image
@@ -75,35 +104,37 @@ def geometric_distance(Xo,Xi,H):
   Xio = np.dot(H,Xo)
   return np.sqrt((Xi[0]/Xi[2] - Xio[0]/Xio[2])**2+(Xi[1]/Xi[2] - Xio[1]/Xio[2])**2)
 
+def geometric_distance_residuals(Xo,Xi,H):
+  """
+  Geometric distance of all the points at once, the inputs are not copied
+  Xo: model points in 2D Homogeneous Coordinates (3xn)
+  Xi: points measured in the image in 2D Homogeneous Coordinates (3xn)
+  H: an estimated homography
+  returns: the distance of each point (n array) and their mean
+  """
+  Xo = np.asarray(Xo)
+  Xi = np.asarray(Xi)
+  Xio = np.dot(np.asarray(H),Xo)
+  residuals = np.sqrt((Xi[0]/Xi[2] - Xio[0]/Xio[2])**2+(Xi[1]/Xi[2] - Xio[1]/Xio[2])**2)
+  return residuals, np.mean(residuals)
+
 def geometric_distance_points(Xo,Xi,H):
-  geom_distances = list()
-  for i in range(Xo.shape[1]):
-      geom_distances.append(geometric_distance(Xo[:,i],Xi[:,i],H))
-  return np.mean(geom_distances)
+  return geometric_distance_residuals(Xo,Xi,H)[1]
 
 
 def volker_metric(A):
-  A = np.copy(A)
-
+  """ Sum of the squared cosines between the L1 normalized rows of A (upper
+  triangle of A.A^T). A can be a 2nx9 matrix or a Mx2nx9 stack, the result
+  is differentiable with autograd """
   # nomarlize each row
-  #A = A/np.linalg.norm(A,axis=1, ord = 1, keepdims=True)
-  for i in range(A.shape[0]):
-    squared_sum = 0
-    for j in range(A.shape[1]):
-      squared_sum += np.sqrt(A[i,j]**2)
-    A[i,:] = A[i,:] / squared_sum
+  A = A/np.sum(np.abs(A), axis=-1, keepdims=True)
 
   # compute the dot product
-  As = np.dot(A,A.T)
+  As = np.matmul(A, np.swapaxes(A, -1, -2))
 
   # we are interested only on the upper top triangular matrix coefficients
-  metric = 0
-  start = 1
-  for i in range(As.shape[0]):
-    for j in range(start,As.shape[0]):
-      metric = metric +  As[i,j]**2
-    start = start +1
-
+  i, j = np.triu_indices(A.shape[-2], k=1)
+  metric = np.sum(As[..., i, j]**2, axis=-1)
 
   #An alternative would be to use only the coefficients which correspond
   # to different points.
@@ -124,21 +155,10 @@ def calculate_A_matrix(Xo, Xi):
     since the points should be on a plane
 
     Xi: Image points in 2D Homogeneous Coordinates (3xn)
+
+    Mx3xn stacks of object and/or image points give a Mx2nx9 stack of A matrices
   """
-  Xo = np.copy(Xo)
-  Xi = np.copy(Xi)
-  Npts = Xo.shape[1]
-  A = np.zeros((2*Npts,9))
-  O = np.zeros(3)
-
-  for i in range(0, Npts):
-      X = Xo[:,i].T
-      u = Xi[0,i]
-      v = Xi[1,i]
-      w = Xi[2,i]
-      A[2*i,:] = np.array([O, -w*X, v*X]).reshape(1, 9)
-      A[2*i+1,:] = np.array([w*X, O, -u*X]).reshape(1, 9)
-  return A
+  return dlt_matrix(Xo, Xi)
 
 def get_matrix_conditioning_number(M):
  #return  np.linalg.norm(M,2)*np.linalg.norm(np.linalg.pinv(M),2)
@@ -155,63 +175,54 @@ def condition_number(A):
   smallest_singular_value = s[-2]
   return greatest_singular_value/smallest_singular_value
 
+def singular_values_batch(A, rtol = 1e-4):
+  """ Singular values (descending) of a (...,2n,9) stack of A matrices.
+  They are obtained from the eigenvalues of the 9x9 matrices A.T*A. The relative
+  error of a singular value s computed this way is about eps*(s[0]/s)**2/2, the
+  matrices where twice this estimate exceeds rtol for the second smallest
+  singular value (condition numbers above ~7e5 for the default) are recomputed
+  with a thin SVD. Raw pixel coordinates give condition numbers around 1e5.
+  rtol: relative accuracy needed on s[-2] and on the condition number
+  returns: (...,min(2n,9)) array
+  """
+  A = np.asarray(A, dtype=np.float64)
+  k = min(A.shape[-2:])
+  G = np.matmul(np.swapaxes(A, -1, -2), A)
+  ev = np.linalg.eigvalsh(G)[..., ::-1][..., :k]
+  s = np.sqrt(np.maximum(ev, 0))
+
+  # the estimate saturates at ~1/sqrt(eps) for singular matrices, which are
+  # therefore recomputed too
+  with np.errstate(divide='ignore', invalid='ignore'):
+    inaccurate = ~(np.finfo(np.float64).eps*(s[..., 0]/s[..., -2])**2 <= rtol)
+  if np.any(inaccurate):
+    s[inaccurate] = np.linalg.svd(A[inaccurate], compute_uv=False)
+  return s
+
+def condition_number_batch(A, rtol = 1e-4):
+  """ condition_number of each A matrix of a (...,2n,9) stack, see
+  singular_values_batch for rtol """
+  s = singular_values_batch(A, rtol)
+  return s[..., 0]/s[..., -2]
+
 def rot_matrix_error(R0, R1, method = 'unit_quaternion_product'):
     """ R0, R1 are 3x3 or 4x4 homogeneous Rotation matrixes
-        returns: the value of the error depending on the method """
+        returns: the value of the error depending on the method, see
+        vision.rotation_metrics for stacks of matrices """
 
     if ((R0.shape != (4,4)) and (R0.shape != (3,3))):
         print ("Error in the R0 input rotation matrix shape, must be 3x3 or 4x4")
-        print R0
+        print (R0)
         return -1
     if ((R1.shape != (4,4)) and (R1.shape != (3,3))):
         print ("Error in the R1 input rotation matrix shape, must be 3x3 or 4x4")
-        print R1
+        print (R1)
         return -1
 
-    if R0.shape == (3,3):
-        R = np.eye(4)
-        R[:3,:3] = R0
-        R0 = R
-
-    if R1.shape == (3,3):
-        R = np.eye(4)
-        R[:3,:3] = R1
-        R1 = R
-
-
-
-    if(method == 'unit_quaternion_product' ):
-        ## From the paper "Metrics for 3D Rotations: Comparison and Analysis" D. Huynh
-        # The 3D rotation error is computed using the inner product of unit quaterions
-
-
-        #We use the ros library TF to convert rotation matrix into unit quaternions
-        from tf import transformations
-        q0 = transformations.quaternion_from_matrix(R0)
-        q1 = transformations.quaternion_from_matrix(R1)
-
-        # We convert into unit quaternions
-        q0 = q0 / np.linalg.norm(q0)
-        q1 = q1 / np.linalg.norm(q1)
-
-        #Find the error as defined in the paper
-        rot_error = 1 - np.linalg.norm(np.dot(q0,q1))
-
-    if(method == 'angle'):
-        #option 2 find the angle of this rotation. In particular, the above is invalid
-        #for very large error angles (error > 90 degrees) and is imprecise for large
-        #error angles (angle > 45 degrees).
-
-        E = R1.dot(R0.T)
-        from cv2 import Rodrigues
-        rot_vector, J = Rodrigues(E[:3,:3])
-
-        angle = np.linalg.norm(rot_vector)
-
-        rot_error = np.rad2deg(angle)
-
-
-    return rot_error
+    ## From the paper "Metrics for 3D Rotations: Comparison and Analysis" D. Huynh
+    # 'unit_quaternion_product' is only valid for small error angles, 'angle'
+    # is the angle of the rotation R1*R0^T in degrees
+    return rotation_error(R0, R1, method)[()]
 
 def calc_estimated_pose_error(tvec_ref, rmat_ref, tvec_est, rmat_est):
     # Translation error percentual
@@ -221,55 +232,78 @@ def calc_estimated_pose_error(tvec_ref, rmat_ref, tvec_est, rmat_est):
     rmat_error = rot_matrix_error(rmat_ref,rmat_est, method = 'angle')
     return tvec_error, rmat_error
 
-def low_upper_bound_homography_error(cam, ObjectPoints):
+POSE_ERROR_DTYPE = np.dtype([('tvec_error', np.float64), ('rmat_error', np.float64)])
+
+def calc_estimated_pose_error_batch(tvec_ref, rmat_ref, tvec_est, rmat_est):
+    """ calc_estimated_pose_error of stacks of estimated poses, e.g. the M
+    trials of several solvers stacked as (S,M,3) and (S,M,3,3)
+    tvec_ref, rmat_ref: reference translation (3 or 4 vector) and rotation
+        (3x3 or 4x4), or stacks broadcastable to the estimates
+    tvec_est: (...,3) estimated translations (homogeneous 4 vectors are accepted)
+    rmat_est: (...,3,3) or (...,4,4) estimated rotations
+    returns: structured array (...) with the percent translation error in
+    'tvec_error' and the rotation angle error in degrees in 'rmat_error'
+    """
+    tvec_ref = np.asarray(tvec_ref, dtype=np.float64)[...,:3]
+    tvec_est = np.asarray(tvec_est, dtype=np.float64)[...,:3]
+    tvec_error = np.linalg.norm(tvec_est - tvec_ref, axis=-1)/np.linalg.norm(tvec_ref, axis=-1)*100.
+    rmat_error = geodesic_angle(rmat_ref, rmat_est)
+
+    tvec_error, rmat_error = np.broadcast_arrays(tvec_error, rmat_error)
+    errors = np.empty(tvec_error.shape, dtype=POSE_ERROR_DTYPE)
+    errors['tvec_error'] = tvec_error
+    errors['rmat_error'] = rmat_error
+    return errors
+
+def low_upper_bound_homography_error(cam, ObjectPoints, trials = 1000, sd = 4, rng = None):
   """ 
   param cam: 
   Camera object, has the current pose of the camera and the camera intrinsics.
   
   param ObjectPoints:
   Set of 4 different object points in 3D homogeneous coordinates (4x4)
-  
+
+  param trials:
+  Number of noisy measurements of the image points
+
+  param sd:
+  Standard deviation of the image noise in pixels
+
+  param rng:
+  Random generator, the global numpy random state is used by default
+
+  returns: relative error of the homography of the noisiest trial (the one
+  with the greatest norm of A), and its lower and upper bounds
   """
-  
+  if rng is None:
+    rng = np.random
+
   # We dont care about the Z coordinate
-  Xo = ObjectPoints[[0,1,3],:]
+  Xo = np.asarray(ObjectPoints)[[0,1,3],:]
   
   # Lets project the points using the simulated camera
   imagePoints = np.array(cam.project(ObjectPoints, False)) 
   
   # Calculate the A matrix of the homography
-  A_true = ef.calculate_A_matrix(Xo, imagePoints)
-  
-  A_noisy_list = []
-  H_noisy_list = []
-  
-  A_noisy_norm_list = []
-  H_noisy_norm_list = []
-  for i in range(1000):
-    imagePoints_noisy = cam.addnoise_imagePoints(imagePoints, mean = 0, sd = 4)
-    A_noisy = ef.calculate_A_matrix(Xo, imagePoints_noisy) 
-    
-    #DLT TRANSFORM    
-    Xi = imagePoints_noisy
-    Hnoisy_dlt,_,_ = homo2d.homography2d(Xo,Xi)
-    Hnoisy_dlt = Hnoisy_dlt/Hnoisy_dlt[2,2]
-    
-    A_noisy_list.append(A_noisy)
-    H_noisy_list.append(Hnoisy_dlt)
-    
-    # WE calculate norms
-    A_noisy_norm_list.append(np.linalg.norm(A_noisy))
-    H_noisy_norm_list.append(np.linalg.norm(Hnoisy_dlt))
-  
-  A_noise_mean = np.mean(A_noisy_norm_list, axis=0)
-  H_noisy_mean = np.mean(H_noisy_norm_list, axis=0)
-  
-  i_max = A_noisy_norm_list.index(max(A_noisy_norm_list))
-  A_noise_mean = A_noisy_list[i_max]
-  H_noisy_mean = H_noisy_list[i_max]
+  A_true = calculate_A_matrix(Xo, imagePoints)
+
+  # All the noisy measurements at once (same draws as calling
+  # cam.addnoise_imagePoints once per trial)
+  imagePoints_noisy = np.empty((trials,) + imagePoints.shape)
+  imagePoints_noisy[:] = imagePoints
+  imagePoints_noisy[:,:2,:] += rng.normal(0, sd, (trials, 2, imagePoints.shape[1]))
+  A_noisy = calculate_A_matrix(Xo, imagePoints_noisy)
+
+  # Only the trial with the greatest norm of A is used for the bounds
+  i_max = np.argmax(np.sqrt(np.sum(A_noisy**2, axis=(1,2))))
+  A_noise_mean = A_noisy[i_max]
+
+  #DLT TRANSFORM
+  H_noisy_mean,_,_ = homography2d(Xo, imagePoints_noisy[i_max])
+  H_noisy_mean = H_noisy_mean/H_noisy_mean[2,2]
   
   # TRUE VALUE OF HOMOGRAPHY OBTAINED FROM CAMERA PARAMETERS
-  H_true = cam.homography_from_Rt()
+  H_true = np.asarray(cam.homography_from_Rt())
   
   H_noisy_norm = np.linalg.norm(H_noisy_mean)
   H_true_norm = np.linalg.norm(H_true)
@@ -281,10 +315,6 @@ def low_upper_bound_homography_error(cam, ObjectPoints):
   rel_error = np.linalg.norm(H_true-H_noisy_mean)/H_true_norm
   Upper = cond*(np.linalg.norm(A_true-A_noise_mean))/A_true_norm
   
-  
-  
-  
-  
   e1 = np.dot(A_true,H_true.reshape(9,1))
   e2 = np.dot(A_noise_mean,H_noisy_mean.reshape(9,1))
   
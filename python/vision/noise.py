@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Reproducible noise streams for the Monte Carlo simulations.
+
+Every stream is derived from a base seed and a key of integers, for example
+(experiment, camera, pattern), with numpy.random.SeedSequence. The same key
+always produces the same numbers, no matter in which order the streams are
+requested or which process requests them.
+
+The image noise of the trials of one key comes from a single counter based
+Philox stream. Every trial consumes a fixed number of counter blocks, so a
+worker jumps straight to its first trial with advance() and draws all its
+trials in one call, and trial i gets the same noise however the trials are
+split between workers.
+"""
+import numpy as np
+
+
+class NoiseStreams(object):
+    """ Factory of independent random streams identified by integer keys.
+
+    Parameters:
+        seed: base entropy shared by all the streams of an experiment run
+    """
+    def __init__(self, seed = 0):
+        self.seed = seed
+
+    def seed_sequence(self, *key):
+        return np.random.SeedSequence(self.seed, spawn_key = tuple(int(k) for k in key))
+
+    def generator(self, *key):
+        """ numpy.random.Generator for the stream identified by key """
+        return np.random.Generator(np.random.PCG64(self.seed_sequence(*key)))
+
+    def philox(self, *key):
+        """ Counter based bit generator for the stream identified by key """
+        return np.random.Philox(self.seed_sequence(*key))
+
+    def image_noise(self, n, trials, sd = 2, mean = 0, key = (), start = 0):
+        """ Gaussian noise for the image points of several trials
+        n: number of image points
+        trials: number of trials to draw
+        key: tuple of integers identifying the experiment, camera, pattern...
+        start: index of the first trial
+        returns: (trials,2,n) array of noise in pixels
+        """
+        # each trial uses 2n uniforms (Box-Muller), rounded up to whole Philox
+        # blocks of 4 values so that trial i always starts at the same counter
+        blocks = -(-2*n//4)
+        bit_generator = self.philox(*key)
+        bit_generator.advance(start*blocks)
+        u = np.random.Generator(bit_generator).random((trials, 4*blocks))
+
+        radius = np.sqrt(-2*np.log1p(-u[:,:n]))
+        angle = 2*np.pi*u[:,n:2*n]
+        noise = np.empty((trials, 2, n))
+        noise[:,0] = radius*np.cos(angle)
+        noise[:,1] = radius*np.sin(angle)
+        noise *= sd
+        noise += mean
+        return noise
+
+    def noisy_image_points(self, imagePoints, trials, sd = 2, mean = 0, key = (), start = 0):
+        """ Copies of imagePoints (3xn) with the noise of each trial added
+        returns: (trials,3,n) array of noisy homogeneous image points
+        """
+        imagePoints = np.asarray(imagePoints, dtype=np.float64)
+        noisy = np.empty((trials,) + imagePoints.shape)
+        noisy[:] = imagePoints
+        if sd > 0:
+            noisy[:,:2,:] += self.image_noise(imagePoints.shape[1], trials, sd, mean, key, start)
+        return noisy
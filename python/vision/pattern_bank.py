@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent bank of random marker layouts.
+
+The layouts are stored as a single (count,4,n) float64 array in a standard .npy
+file, so the bank can be opened as a read only memmap by any number of processes
+(or with a plain np.load). The .npy header has a fixed size and is rewritten on
+every append, new layouts are written at the end of the file without touching
+the existing ones. The generation metadata (plane type, size or radius, n, r,
+min_sep, seed...) is kept in a JSON sidecar next to the array.
+
+    bank = PatternBank.generate('Data/bank.npy', pl, count = 10**6, n = 4, seed = 1)
+    bank = PatternBank('Data/bank.npy')
+    for chunk in bank.iter_chunks(10000):
+        ...
+"""
+import os
+import json
+import numpy as np
+
+
+HEADER_LEN = 128
+DTYPE = np.dtype('<f8')
+
+
+def _write_header(f, count, n):
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, 4, %d), }" % (DTYPE.str, count, n)
+    header = header.ljust(HEADER_LEN - 10 - 1) + '\n'
+    f.seek(0)
+    f.write(np.lib.format.magic(1, 0))
+    f.write(np.array(len(header), dtype='<u2').tobytes())
+    f.write(header.encode('latin1'))
+
+
+def metadata_path(path):
+    return path + '.json'
+
+
+class PatternBank(object):
+    """ Layouts of n features stored on disk.
+
+    Parameters:
+        path: .npy file of the bank, created with PatternBank.create
+        mode: 'r' to only read, 'r+' to also append layouts
+    """
+    def __init__(self, path, mode = 'r'):
+        self.path = path
+        self.mode = mode
+        with open(metadata_path(path)) as f:
+            self.metadata = json.load(f)
+        self.n = self.metadata['n']
+        self.reload()
+
+    @classmethod
+    def create(cls, path, n, overwrite = False, **metadata):
+        """ Create an empty bank for layouts of n features
+        metadata: generation parameters kept with the bank (plane_type, radius, r...)
+        """
+        if os.path.exists(path) and not overwrite:
+            raise IOError("Pattern bank %s already exists" % path)
+        metadata = dict(metadata)
+        metadata['n'] = int(n)
+        with open(path, 'wb') as f:
+            _write_header(f, 0, n)
+        with open(metadata_path(path), 'w') as f:
+            json.dump(metadata, f, indent=2, sort_keys=True)
+        return cls(path, mode = 'r+')
+
+    @classmethod
+    def generate(cls, path, plane, count, n = 4, r = 0.05, min_sep = 0.01, seed = 0,
+                 chunk_size = 10000, overwrite = False):
+        """ Create a bank with count random layouts of a Plane or CircularPlane,
+        generated with plane.random_batch in chunks of chunk_size layouts """
+        metadata = {'plane_type': plane.type, 'size': list(plane.size),
+                    'r': r, 'min_sep': min_sep, 'seed': seed,
+                    'origin': [float(o) for o in plane.origin]}
+        if plane.type == 'circular':
+            metadata['radius'] = plane.radius
+        bank = cls.create(path, n, overwrite, **metadata)
+        rng = np.random.RandomState(seed)
+        for start in range(0, count, chunk_size):
+            bank.append(plane.random_batch(min(chunk_size, count - start), n, r, min_sep, rng = rng))
+        return bank
+
+    def reload(self):
+        """ Map the current content of the file, e.g. after another process
+        appended layouts """
+        count = self.count_on_disk()
+        if count == 0:
+            # an empty file can not be memory mapped
+            self.patterns = np.empty((0, 4, self.n), dtype=DTYPE)
+        else:
+            self.patterns = np.load(self.path, mmap_mode = 'r')
+
+    def count_on_disk(self):
+        with open(self.path, 'rb') as f:
+            np.lib.format.read_magic(f)
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        return shape[0]
+
+    def append(self, patterns):
+        """ Add layouts to the end of the bank
+        patterns: 4xn layout or a Mx4xn stack, e.g. from Plane.random_batch
+        """
+        if self.mode != 'r+':
+            raise IOError("Pattern bank %s is opened read only" % self.path)
+        patterns = np.ascontiguousarray(patterns, dtype=DTYPE)
+        if patterns.ndim == 2:
+            patterns = patterns[np.newaxis]
+        if patterns.shape[1:] != (4, self.n):
+            raise ValueError("Layouts must be 4x%d, got %s" % (self.n, patterns.shape[1:]))
+        count = self.count_on_disk()
+        with open(self.path, 'r+b') as f:
+            f.seek(HEADER_LEN + count*4*self.n*DTYPE.itemsize)
+            f.write(patterns.tobytes())
+            f.flush()
+            _write_header(f, count + patterns.shape[0], self.n)
+        self.reload()
+
+    def __len__(self):
+        return self.patterns.shape[0]
+
+    def __getitem__(self, index):
+        """ Layout i (4xn) or a stack of layouts for slices and index arrays """
+        return self.patterns[index]
+
+    def iter_chunks(self, chunk_size = 10000, start = 0, stop = None):
+        """ Iterate over the layouts in (chunk_size,4,n) blocks, the blocks are
+        views of the memmap and are only read from disk when used """
+        if stop is None:
+            stop = len(self)
+        for i in range(start, stop, chunk_size):
+            yield self.patterns[i:min(i + chunk_size, stop)]
+
+    def sample(self, M, rng = None):
+        """ M layouts drawn at random (with replacement) from the bank, in the
+        order they were drawn
+        rng: numpy Generator or RandomState, the global numpy random state is
+             used by default
+        """
+        if rng is None:
+            rng = np.random
+        if hasattr(rng, 'integers'):
+            index = rng.integers(0, len(self), M)
+        else:
+            index = rng.randint(0, len(self), M)
+        # read the memmap in file order, then restore the draw order
+        order = np.argsort(index)
+        layouts = np.empty((M, 4, self.n), dtype=DTYPE)
+        layouts[order] = self.patterns[index[order]]
+        return layouts
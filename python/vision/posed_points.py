@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Lazily posed points of the planar objects (Plane, CircularPlane, Screen).
+
+The objects keep their points in local coordinates and accumulate the rigid
+transformations applied to them in a 4x4 pose, the world points are only
+computed when plane_points is read.
+"""
+import autograd.numpy as np
+from vision.rt_matrix import rotation_matrix
+
+
+class PosedPoints(object):
+    """ Mixin for the objects with 4xn homogeneous local points and an origin
+    (the center of the rotations) """
+
+    @property
+    def plane_points(self):
+        """ Points of the plane in world coordinates. The accumulated pose is
+        applied to the local points only when they are requested and the
+        result is cached until the pose changes. Without a pose the local
+        points themselves are returned, so they can be modified in place.
+        Once there is a pose the cached world points are read only, an in place
+        edit would be lost at the next rotation, so it raises an error instead;
+        assign new points (which resets the pose) to change them.
+        The world points keep the precision of the local points, float32 (or
+        memmap) local points give float32 world points. """
+        if self.pose is None:
+            return self.local_points
+        if self.world_points is None:
+            dtype = np.result_type(self.local_points.dtype, np.float32)
+            self.world_points = np.dot(self.pose.astype(dtype), self.local_points)
+            self.world_points.flags.writeable = False
+        return self.world_points
+
+    @plane_points.setter
+    def plane_points(self, points):
+        """ New local points, the accumulated pose is reset """
+        self.local_points = points
+        self.pose = None
+        self.world_points = None
+
+    def transform(self, T):
+        """ compose the 4x4 transformation T (in world coordinates) with the
+        pose of the plane, the points are not touched """
+        if self.pose is None:
+            self.pose = np.array(T, dtype=np.float64)
+        else:
+            self.pose = np.dot(T, self.pose)
+        self.world_points = None
+
+    def rotate(self, axis, angle):
+        """ rotate plane points around a given axis in world coordinates"""
+        # rotation around the origin of the plane
+        T = rotation_matrix(axis, angle)
+        T[:3,3] = self.origin[:3] - np.dot(T[:3,:3], self.origin[:3])
+        self.transform(T)
+
+    def rotate_x(self,angle):
+        self.rotate(np.array([1,0,0],dtype=np.float32), angle)
+
+    def rotate_y(self,angle):
+        self.rotate(np.array([0,1,0],dtype=np.float32), angle)
+
+    def rotate_z(self,angle):
+        self.rotate(np.array([0,0,1],dtype=np.float32), angle)
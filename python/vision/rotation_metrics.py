@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Distances between 3D rotations, computed with NumPy only.
+
+All the functions accept single 3x3 or 4x4 homogeneous rotation matrices as
+well as (...,3,3) or (...,4,4) stacks, and broadcast R0 against R1, so every
+trial of a Monte Carlo run can be scored in one call.
+
+See "Metrics for 3D Rotations: Comparison and Analysis", D. Huynh (2009).
+"""
+import numpy as np
+
+
+def rotation_stack(R):
+    """ (...,3,3) rotation part of 3x3/4x4 matrices or stacks of them """
+    R = np.asarray(R, dtype=np.float64)
+    if R.shape[-2:] not in ((3,3), (4,4)):
+        raise ValueError("Rotation matrices must be 3x3 or 4x4, got %s" % (R.shape[-2:],))
+    return R[...,:3,:3]
+
+
+def geodesic_angle(R0, R1):
+    """ Angle in degrees of the rotation R1*R0^T (the rotation taking R0 to R1).
+    It is computed with atan2 from the trace and the skew part of R1*R0^T,
+    which is accurate for small and for large angles """
+    R0 = rotation_stack(R0)
+    R1 = rotation_stack(R1)
+    E = np.matmul(R1, np.swapaxes(R0, -1, -2))
+    d = np.stack([E[...,2,1] - E[...,1,2],
+                  E[...,0,2] - E[...,2,0],
+                  E[...,1,0] - E[...,0,1]], axis=-1)
+    # 2*sin(angle) and 2*cos(angle)
+    s = np.sqrt(np.sum(d**2, axis=-1))
+    c = np.trace(E, axis1=-2, axis2=-1) - 1
+    return np.rad2deg(np.arctan2(s, c))
+
+
+def quaternion_from_matrix(R):
+    """ Unit quaternions [x, y, z, w] (...,4) of a stack of rotation matrices,
+    the eigenvector of the largest eigenvalue of the symmetric matrix K of
+    Bar-Itzhack (as in tf.transformations.quaternion_from_matrix) """
+    R = rotation_stack(R)
+    m00, m01, m02 = R[...,0,0], R[...,0,1], R[...,0,2]
+    m10, m11, m12 = R[...,1,0], R[...,1,1], R[...,1,2]
+    m20, m21, m22 = R[...,2,0], R[...,2,1], R[...,2,2]
+    K = np.empty(R.shape[:-2] + (4,4))
+    K[...,0,0] = m00 - m11 - m22
+    K[...,1,1] = m11 - m00 - m22
+    K[...,2,2] = m22 - m00 - m11
+    K[...,3,3] = m00 + m11 + m22
+    K[...,1,0] = K[...,0,1] = m01 + m10
+    K[...,2,0] = K[...,0,2] = m02 + m20
+    K[...,3,0] = K[...,0,3] = m21 - m12
+    K[...,2,1] = K[...,1,2] = m12 + m21
+    K[...,3,1] = K[...,1,3] = m02 - m20
+    K[...,3,2] = K[...,2,3] = m10 - m01
+    K /= 3.0
+    w, V = np.linalg.eigh(K)
+    q = V[...,:,-1]
+    # same sign convention as tf, w >= 0
+    return np.where(q[...,3:] < 0, -q, q)
+
+
+def quaternion_metric(R0, R1):
+    """ 1 - |q0.q1| for the unit quaternions of R0 and R1, in [0, 1] """
+    q0 = quaternion_from_matrix(R0)
+    q1 = quaternion_from_matrix(R1)
+    return 1 - np.abs(np.sum(q0*q1, axis=-1))
+
+
+def chordal_distance(R0, R1):
+    """ Frobenius norm of R0 - R1 """
+    R0 = rotation_stack(R0)
+    R1 = rotation_stack(R1)
+    return np.sqrt(np.sum((R0 - R1)**2, axis=(-2,-1)))
+
+
+METRICS = {'angle': geodesic_angle,
+           'unit_quaternion_product': quaternion_metric,
+           'chordal': chordal_distance}
+
+
+def rotation_error(R0, R1, method = 'unit_quaternion_product'):
+    """ Error between (stacks of) rotations with one of the METRICS """
+    return METRICS[method](R0, R1)
@@ -8,6 +8,7 @@ Created on Thu Jun 29 17:08:12 2017
 from scipy.linalg import expm
 import numpy as np
 from math import cos, sin
+from vision.rotation_metrics import rotation_error
 
 def rotation_matrix(a, alpha):
     """  Creates a 3D [R|t] matrix for rotation
@@ -40,72 +41,61 @@ def rotation_matrix_from_two_vectors(a,b):
     R[:3,:3] = np.array(np.eye(3) + ssc + (ssc**2)*(1.0/(1.0+np.dot(a,b))))
     return R
 
+def look_at_batch(eyes, target = np.zeros(3), up = np.array([0., 1., 0.])):
+    """ Poses of cameras placed at eyes looking at target (same convention
+    as Camera.look_at: the rows of R are the camera axes in world coordinates
+    and the z axis points to the target).
+    eyes: Mx3 (or a single 3-vector) camera positions in world coordinates
+    target: point looked at in world coordinates
+    up: world direction that maps to the camera y axis. For eyes looking along
+    up, the world axis least aligned with the viewing direction is used instead.
+    returns: R Mx4x4 homogeneous rotations and Rt Mx4x4 [R | -R*eye] matrices
+    """
+    eyes = np.atleast_2d(np.asarray(eyes, dtype=np.float64))
+    M = eyes.shape[0]
+
+    zaxis = np.asarray(target, dtype=np.float64) - eyes
+    zaxis /= np.linalg.norm(zaxis, axis=1)[:,np.newaxis]
+
+    up = np.broadcast_to(np.asarray(up, dtype=np.float64), (M,3))
+    xaxis = np.cross(up, zaxis)
+    xnorm = np.linalg.norm(xaxis, axis=1)
+    degenerate = xnorm < 1e-9*np.linalg.norm(up, axis=1)
+    if degenerate.any():
+        alt_up = np.eye(3)[np.argmin(np.abs(zaxis[degenerate]), axis=1)]
+        xaxis[degenerate] = np.cross(alt_up, zaxis[degenerate])
+        xnorm[degenerate] = np.linalg.norm(xaxis[degenerate], axis=1)
+    xaxis /= xnorm[:,np.newaxis]
+    yaxis = np.cross(zaxis, xaxis)
+
+    R = np.zeros((M,4,4))
+    R[:,0,:3] = xaxis
+    R[:,1,:3] = yaxis
+    R[:,2,:3] = zaxis
+    R[:,3,3] = 1.
+
+    Rt = R.copy()
+    Rt[:,:3,3] = -np.einsum('mij,mj->mi', R[:,:3,:3], eyes)
+    return R, Rt
+
 def rot_matrix_error(R0, R1, method = 'unit_quaternion_product'):
     """ R0, R1 are 3x3 or 4x4 homogeneous Rotation matrixes
-        returns: the value of the error depending on the method """
+        returns: the value of the error depending on the method, see
+        vision.rotation_metrics for stacks of matrices """
 
     if ((R0.shape != (4,4)) and (R0.shape != (3,3))):
         print ("Error in the R0 input rotation matrix shape, must be 3x3 or 4x4")
-        print R0
+        print (R0)
         return -1
     if ((R1.shape != (4,4)) and (R1.shape != (3,3))):
         print ("Error in the R1 input rotation matrix shape, must be 3x3 or 4x4")
-        print R1
+        print (R1)
         return -1
 
-    if R0.shape == (3,3):
-        R = np.eye(4)
-        R[:3,:3] = R0
-        R0 = R
-
-    if R1.shape == (3,3):
-        R = np.eye(4)
-        R[:3,:3] = R1
-        R1 = R
-
-
-
-    if(method == 'unit_quaternion_product' ):
-        ## From the paper "Metrics for 3D Rotations: Comparison and Analysis" D. Huynh
-        # The 3D rotation error is computed using the inner product of unit quaterions
-
-
-        #We use the ros library TF to convert rotation matrix into unit quaternions
-        from tf import transformations
-        q0 = transformations.quaternion_from_matrix(R0)
-        q1 = transformations.quaternion_from_matrix(R1)
-
-        # We convert into unit quaternions
-        q0 = q0 / np.linalg.norm(q0)
-        q1 = q1 / np.linalg.norm(q1)
-
-        #Find the error as defined in the paper
-        rot_error = 1 - np.linalg.norm(np.dot(q0,q1))
-
-    if(method == 'angle'):
-        #option 2 find the angle of this rotation. In particular, the above is invalid
-        #for very large error angles (error > 90 degrees) and is imprecise for large
-        #error angles (angle > 45 degrees).
-
-        E = R1.dot(R0.T)
-        from cv2 import Rodrigues
-        rot_vector, J = Rodrigues(E[:3,:3])
-
-        angle = np.linalg.norm(rot_vector)
-
-        rot_error = np.rad2deg(angle)
-#        d = np.zeros(3)
-#        d[0] = E[1,2] - E[2,1]
-#        d[1] = E[2,0] - E[0,2]
-#        d[2] = E[0,1] - E[1,0]
-#
-#        dmag = sqrt(d[0]*d[0] + d[1]*d[1] + d[2]*d[2])
-#
-#        phi = np.rad2deg(asin(dmag/2))
-#
-#        rot_error = phi
-
-    return rot_error
+    ## From the paper "Metrics for 3D Rotations: Comparison and Analysis" D. Huynh
+    # 'unit_quaternion_product' is only valid for small error angles, 'angle'
+    # is the angle of the rotation R1*R0^T in degrees
+    return rotation_error(R0, R1, method)[()]
 
 
 #TODO MAYBE USE the TF package directly
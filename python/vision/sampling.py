@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Random sampling of feature positions on planar patterns.
+
+sample_cells draws batches of layouts from a fixed set of candidate cells,
+without replacement, and plane_layouts turns the 2D positions into homogeneous
+plane points. poisson_disk_batch places features in continuous coordinates with
+a guaranteed minimum distance, using the background grid of Bridson ("Fast
+Poisson Disk Sampling in Arbitrary Dimensions", SIGGRAPH 2007) to check each
+candidate against its neighbours only.
+
+"""
+import numpy as np
+
+
+def sample_cells(cells, M, n, rng = None):
+    """ M independent random choices of n different cells
+    cells: 2xk array of candidate cell centers
+    rng: random generator, the global numpy random state is used by default
+    returns: Mx2xn array of cell centers
+    """
+    if rng is None:
+        rng = np.random
+    k = cells.shape[1]
+    if n > k:
+        raise ValueError("Only %d features fit on the plane, %d requested" % (k, n))
+
+    # the n cells with the smallest random keys of each row are a uniform
+    # sample without replacement, ordered by their key
+    keys = rng.uniform(0., 1., (M, k))
+    if n < k:
+        selected = np.argpartition(keys, n-1, axis=1)[:,:n]
+    else:
+        selected = np.tile(np.arange(k), (M, 1))
+    rows = np.arange(M)[:,np.newaxis]
+    selected = selected[rows, np.argsort(keys[rows, selected], axis=1)]
+    return np.stack((cells[0][selected], cells[1][selected]), axis=1)
+
+
+def plane_layouts(xy, origin):
+    """ Mx4xn homogeneous points of Mx2xn feature positions on a plane whose
+    center is at origin """
+    points = np.empty((xy.shape[0], 4, xy.shape[2]), dtype=np.float64)
+    points[:,0] = xy[:,0] + origin[0]
+    points[:,1] = xy[:,1] + origin[1]
+    points[:,2] = origin[2]
+    points[:,3] = 1
+    return points
+
+
+# offsets of the 5x5 neighbourhood of a grid cell
+_NEIGHBOURS = np.array([(i, j) for i in range(-2, 3) for j in range(-2, 3)])
+
+
+def poisson_disk_batch(M, n, lower, upper, d, inside = None, k = 30, rng = None,
+                       max_rejections = 30, max_restarts = 100):
+    """ M independent sets of n points at a minimum distance d of each other
+    (blue noise) in continuous coordinates.
+    The accepted points of each set are kept in a background grid with cells of
+    size d/sqrt(2), a cell holds at most one point, so a candidate is only
+    compared with the points of its 5x5 neighbouring cells and a set costs O(n).
+    Every unfinished set tries one candidate per iteration. Candidates are first
+    drawn uniformly over the domain (dart throwing), once a set rejects
+    max_rejections of them in a row it grows from its own points as in Bridson's
+    algorithm: candidates are drawn in the annulus [d, 2d) around a random active
+    point, which is retired after k rejected tries. A set whose active points are
+    all retired is maximal without having n points, only that set is restarted.
+    lower, upper: corners of the rectangle containing the points (2 values each)
+    d: minimum distance between two points
+    inside: optional function f(x,y) -> bool array restricting the domain further
+    k: tries around an active point before it is retired
+    rng: random generator, the global numpy random state is used by default
+    max_rejections: consecutive rejected uniform candidates before a set grows
+                    from its active points
+    max_restarts: restarts of a set before giving up (ValueError), i.e. the n
+                  points practically do not fit in the domain
+    returns: Mx2xn array of points
+    """
+    if rng is None:
+        rng = np.random
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+
+    cell = d/np.sqrt(2)
+    grid_shape = np.maximum(np.ceil((upper - lower)/cell).astype(int), 1)
+    grid = -np.ones((M,) + tuple(grid_shape), dtype=int)
+    # zeros, the distances to unused slots are computed (and masked) too
+    points = np.zeros((M, n, 2), dtype=np.float64)
+    count = np.zeros(M, dtype=int)
+    rejections = np.zeros(M, dtype=int)
+    restarts = np.zeros(M, dtype=int)
+    growing = np.zeros(M, dtype=bool)
+    active = np.zeros((M, n), dtype=bool)
+    tries = np.zeros((M, n), dtype=int)
+
+    unfinished = np.arange(M)
+    while unfinished.size:
+        candidates = rng.uniform(lower, upper, (unfinished.size, 2))
+
+        # annulus candidates around a random active point of the growing sets
+        grow = growing[unfinished]
+        growers = unfinished[grow]
+        keys = rng.uniform(0., 1., (growers.size, n))
+        keys[~active[growers]] = -1
+        around = np.argmax(keys, axis=1)
+        rho = np.sqrt(rng.uniform(d**2, 4*d**2, growers.size))
+        theta = rng.uniform(0, 2*np.pi, growers.size)
+        candidates[grow] = points[growers, around] + np.column_stack((rho*np.cos(theta), rho*np.sin(theta)))
+
+        valid = np.all((candidates >= lower) & (candidates < upper), axis=1)
+        if inside is not None:
+            valid &= inside(candidates[:,0], candidates[:,1])
+        cells = np.clip(((candidates - lower)/cell).astype(int), 0, grid_shape - 1)
+
+        # distance to the points in the neighbouring cells
+        neighbour_cells = cells[:,np.newaxis,:] + _NEIGHBOURS
+        in_grid = np.all((neighbour_cells >= 0) & (neighbour_cells < grid_shape), axis=2)
+        neighbour_cells = np.clip(neighbour_cells, 0, grid_shape - 1)
+        sets = unfinished[:,np.newaxis]
+        neighbours = grid[sets, neighbour_cells[...,0], neighbour_cells[...,1]]
+        occupied = in_grid & (neighbours >= 0)
+        diff = points[sets, np.maximum(neighbours, 0)] - candidates[:,np.newaxis,:]
+        valid &= ~np.any(occupied & (np.sum(diff**2, axis=2) < d**2), axis=1)
+
+        accepted = unfinished[valid]
+        slots = count[accepted]
+        points[accepted, slots] = candidates[valid]
+        grid[accepted, cells[valid,0], cells[valid,1]] = slots
+        active[accepted, slots] = True
+        tries[accepted, slots] = 0
+        count[accepted] += 1
+        rejections[accepted] = 0
+
+        rejected = unfinished[~valid]
+        rejections[rejected] += 1
+        failed = ~valid[grow]
+        grown, retried = growers[failed], around[failed]
+        tries[grown, retried] += 1
+        active[grown, retried] &= tries[grown, retried] < k
+        growing[rejected[rejections[rejected] >= max_rejections]] = True
+
+        # sets that are maximal with less than n points start again
+        stalled = unfinished[growing[unfinished] & ~np.any(active[unfinished], axis=1)
+                             & (count[unfinished] < n)]
+        if stalled.size:
+            restarts[stalled] += 1
+            if np.any(restarts[stalled] > max_restarts):
+                raise ValueError("Could not place %d points at a distance of %s" % (n, d))
+            grid[stalled] = -1
+            count[stalled] = 0
+            rejections[stalled] = 0
+            growing[stalled] = False
+            active[stalled] = False
+        unfinished = unfinished[count[unfinished] < n]
+
+    return np.swapaxes(points, 1, 2)
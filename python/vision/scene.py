@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Scene made of several planar objects (Plane, CircularPlane, Screen).
+
+The points of all the objects are kept in one contiguous 4xN homogeneous
+buffer, with a table of offsets and a table of colors, so the whole scene is
+projected through a Camera or a CameraArray with a single matrix product.
+"""
+import numpy as np
+from vision.camera import CameraArray
+
+
+class Scene(object):
+    """ Collection of planar objects sharing one point buffer.
+
+    The buffer is a snapshot of the world points of the objects, call update()
+    after moving or regenerating them.
+    """
+    def __init__(self, objects = ()):
+        self.objects = list(objects)
+        self.update()
+
+    def add(self, obj):
+        """ Add a planar object, returns its index in the scene """
+        self.objects.append(obj)
+        self.update()
+        return len(self.objects) - 1
+
+    def update(self):
+        """ Rebuild the point buffer and the offset and color tables """
+        sizes = [np.shape(obj.plane_points)[1] for obj in self.objects]
+        self.offsets = np.concatenate(([0], np.cumsum(sizes))).astype(int)
+        self.points = np.empty((4, self.offsets[-1]), dtype=np.float64)
+        for i, obj in enumerate(self.objects):
+            self.points[:, self.offsets[i]:self.offsets[i+1]] = obj.plane_points
+        self.colors = np.array([obj.get_color() for obj in self.objects], dtype=np.float64).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get_points(self, i = None):
+        """ View of the buffer with the points of object i (all if None) """
+        if i is None:
+            return self.points
+        return self.points[:, self.offsets[i]:self.offsets[i+1]]
+
+    def object_index(self):
+        """ Index of the object of each point of the buffer (N array) """
+        return np.repeat(np.arange(len(self.objects)), np.diff(self.offsets))
+
+    def point_colors(self):
+        """ Color of each point of the buffer (Nx3 array) """
+        return self.colors[self.object_index()]
+
+    def split(self, x):
+        """ Per object views of a (...,k,N) array of values for the buffer points """
+        return [x[..., self.offsets[i]:self.offsets[i+1]] for i in range(len(self.objects))]
+
+    def project(self, cam, quant_error = False):
+        """ Project the whole scene in one call
+        cam: Camera (or CompactCamera) or CameraArray
+        returns: the image points of the buffer (3xN, or Mx3xN for a
+        CameraArray of M cameras) and the list of per object views into them
+        """
+        if isinstance(cam, CameraArray):
+            out = np.empty((len(cam), 3, self.points.shape[1]), dtype=np.float64)
+        else:
+            out = np.empty((3, self.points.shape[1]), dtype=np.float64)
+        x = cam.project(self.points, quant_error, out=out)
+        return x, self.split(x)
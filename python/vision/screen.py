@@ -52,35 +52,73 @@ class Screen(Plane):
             print("curved screen")
             
     
-    def update_curved(self):
-        #we create a plane in the x-y plane        
-        # create x,y
-        x_range = range(int(round(self.grid_size[0]/self.grid_step)))
-        y_range = range(int(round(self.grid_size[1]/self.grid_step)))
-        xx, yy = np.meshgrid(x_range, y_range)
-        # center the plane
-        xx = (xx.astype(np.float32))*self.grid_step - (x_range[-1]*self.grid_step/2.)
-        yy = (yy.astype(np.float32))*self.grid_step - (y_range[-1]*self.grid_step/2.)
-        
-        # calculate corresponding z        
-        teta = np.arccos((xx)/(self.curvature_radius/2.0))
-        zz = self.curvature_radius - self.curvature_radius*np.sin(teta)      
-        
-        
-        hh = np.ones_like(xx, dtype=np.float32)
-        self.plane_points = np.array([xx.ravel(),yy.ravel(),zz.ravel(), hh.ravel()], dtype=np.float32)         
+    def curved_grid(self):
+        """ x and y coordinates (float32, centered) of the pixel grid and the z
+        of each column of the curved surface """
+        nx = int(round(self.grid_size[0]/self.grid_step))
+        ny = int(round(self.grid_size[1]/self.grid_step))
+        x = np.arange(nx, dtype=np.float32)*np.float32(self.grid_step) - np.float32((nx-1)*self.grid_step/2.)
+        y = np.arange(ny, dtype=np.float32)*np.float32(self.grid_step) - np.float32((ny-1)*self.grid_step/2.)
+        # the curvature is along x, z is the same for all the rows
+        teta = np.arccos((x)/(self.curvature_radius/2.0))
+        z = (self.curvature_radius - self.curvature_radius*np.sin(teta)).astype(np.float32)
+        return x, y, z
+
+    def iter_curved_tiles(self, rows_per_tile = 64, world = True):
+        """ Generate the curved screen surface in tiles of rows_per_tile pixel rows,
+        only one tile is in memory at a time
+        world: apply the accumulated pose of the screen (rotate, transform) to
+               the tiles, otherwise they are in the screen frame translated to
+               the origin
+        yields: (start, tile) where tile is a 4xk float32 array of homogeneous
+        points and start is the index of its first point in the full screen
+        (row major, as update_curved)
+        """
+        pose = self.pose if world else None
+        if pose is not None:
+            pose = pose.astype(np.float32)
+        x, y, z = self.curved_grid()
+        nx = x.size
+        for i in range(0, y.size, rows_per_tile):
+            rows = y[i:i+rows_per_tile]
+            tile = np.empty((4, rows.size, nx), dtype=np.float32)
+            tile[0] = x + np.float32(self.origin[0])
+            tile[1] = rows[:,np.newaxis] + np.float32(self.origin[1])
+            tile[2] = z + np.float32(self.origin[2])
+            tile[3] = 1
+            tile = tile.reshape(4, -1)
+            if pose is not None:
+                tile = np.dot(pose, tile)
+            yield i*nx, tile
+
+    def curved_points(self, rows_per_tile = 64, filename = None, world = True):
+        """ All the points of the curved screen as a 4xN float32 array, filled
+        tile by tile
+        filename: if given the array is a memmap backed by this file
+        world: apply the pose of the screen, see iter_curved_tiles
+        """
+        x, y, z = self.curved_grid()
+        shape = (4, x.size*y.size)
+        if filename is None:
+            points = np.empty(shape, dtype=np.float32)
+        else:
+            points = np.memmap(filename, dtype=np.float32, mode='w+', shape=shape)
+        for start, tile in self.iter_curved_tiles(rows_per_tile, world):
+            points[:, start:start+tile.shape[1]] = tile
+        return points
+
+    def update_curved(self, rows_per_tile = 64, filename = None):
+        #we create the curved screen in the x-y plane, translated to the origin
+        #(new local points, the pose is reset)
+        self.plane_points = self.curved_points(rows_per_tile, filename, world = False)
         self.plane_points_basis = self.plane_points
-#       
-##        
-        # translate        
-        self.plane_points[0] += self.origin[0]
-        self.plane_points[1] += self.origin[1]
-        self.plane_points[2] += self.origin[2]
-        
-        
-        self.xx = xx
-        self.yy = yy
-        self.zz = zz
+
+        # the meshes are in the screen frame (without the origin), as read only
+        # broadcast views of the grid instead of full size copies
+        x, y, z = self.curved_grid()
+        self.xx = np.broadcast_to(x, (y.size, x.size))
+        self.yy = np.broadcast_to(y[:,np.newaxis], (y.size, x.size))
+        self.zz = np.broadcast_to(z, (y.size, x.size))
 
 
 #
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Composable model of the image sensor.
+
+A SensorPipeline turns ideal projected points into measured points. Its stages
+(quantization, Gaussian or depth dependent noise, detection dropout and out of
+image masking) are applied in the order they were added, in place on a single
+buffer, to 3xn points or Mx3xn stacks. The result comes with a boolean mask of
+the valid detections, which the homography and pose solvers accept.
+"""
+import numpy as np
+
+
+class SensorPipeline(object):
+    """ Ordered list of sensor stages, every method adds a stage and returns the
+    pipeline so that they can be chained:
+
+        sensor = SensorPipeline().gaussian_noise(sd = 1).quantize().clip_to_image()
+    """
+    def __init__(self):
+        self.stages = []
+
+    def copy(self):
+        """ Independent pipeline with the same stages """
+        new_sensor = SensorPipeline()
+        new_sensor.stages = [(name, dict(params)) for name, params in self.stages]
+        return new_sensor
+
+    def quantize(self):
+        """ Round the image points to the pixel grid """
+        self.stages.append(('quantize', {}))
+        return self
+
+    def gaussian_noise(self, sd = 2, mean = 0):
+        """ Gaussian noise with sd pixels of standard deviation """
+        self.stages.append(('gaussian_noise', {'sd': sd, 'mean': mean}))
+        return self
+
+    def depth_noise(self, sd = 2, ref_depth = 1.0):
+        """ Gaussian noise whose standard deviation grows linearly with the
+        depth of the point, sd pixels at ref_depth (meters) """
+        self.stages.append(('depth_noise', {'sd': sd, 'ref_depth': ref_depth}))
+        return self
+
+    def dropout(self, p = 0.1):
+        """ Each point is lost (not detected) with probability p """
+        self.stages.append(('dropout', {'p': p}))
+        return self
+
+    def clip_to_image(self):
+        """ Points behind the camera or outside the image are not detected """
+        self.stages.append(('clip_to_image', {}))
+        return self
+
+    def apply(self, imagePoints, img_width, img_height, depth = None, rng = None, out = None):
+        """ Run the stages over the image points
+        imagePoints: 3xn homogeneous image points or a Mx3xn stack
+        img_width, img_height: image size, scalar or one per camera of the stack
+        depth: depth of each point (n or Mxn), needed by depth_noise
+        rng: random generator (e.g. from vision.noise.NoiseStreams), the global
+             numpy random state is used by default
+        out: buffer for the result, may be imagePoints itself
+        returns: the measured points and a boolean mask (n or Mxn) of the valid ones
+        """
+        if rng is None:
+            rng = np.random
+        if out is None:
+            x = np.array(imagePoints, dtype=np.float64)
+        else:
+            x = out
+            if x is not imagePoints:
+                x[...] = imagePoints
+        mask = np.ones(x.shape[:-2] + x.shape[-1:], dtype=bool)
+        xy = x[...,:2,:]
+
+        for name, params in self.stages:
+            if name == 'quantize':
+                np.around(xy, decimals=0, out=xy)
+            elif name == 'gaussian_noise':
+                if params['sd'] > 0:
+                    xy += rng.normal(params['mean'], params['sd'], xy.shape)
+            elif name == 'depth_noise':
+                sd = params['sd']*np.asarray(depth)/params['ref_depth']
+                xy += rng.normal(0., 1., xy.shape)*sd[...,np.newaxis,:]
+            elif name == 'dropout':
+                mask &= rng.uniform(0., 1., mask.shape) >= params['p']
+            elif name == 'clip_to_image':
+                width = np.asarray(img_width)
+                height = np.asarray(img_height)
+                if width.ndim > 0:
+                    width = width[...,np.newaxis]
+                    height = height[...,np.newaxis]
+                mask &= (x[...,0,:] > 0) & (x[...,0,:] < width)
+                mask &= (x[...,1,:] > 0) & (x[...,1,:] < height)
+                if depth is not None:
+                    mask &= np.asarray(depth) > 0
+        return x, mask
+
+
+def select_valid(mask, *points):
+    """ Keep only the columns of each 2D point array where mask is True """
+    if mask is None:
+        return points
+    return tuple(np.asarray(p)[:,mask] for p in points)
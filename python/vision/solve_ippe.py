@@ -6,14 +6,17 @@ Created on Mon Jul 10 18:31:46 2017
 """
 import numpy as np
 from ippe import homo2d, ippe
+from vision.sensor import select_valid
 
-def pose_ippe_both(objectPoints, normalizedimagePoints, debug = False):
+def pose_ippe_both(objectPoints, normalizedimagePoints, debug = False, mask = None):
     """ This function calculates the pose using the IPPE algorithm which
     returns to possible poses. It returns both poses for comparison.
 
     objectPoints:  4xn homogeneous 3D object coordinates
     normalizedimagePoints: 3xn homogeneous normalized pixel coordinates
+    mask: optional boolean array of valid points (e.g. from a SensorPipeline)
     """
+    objectPoints, normalizedimagePoints = select_valid(mask, objectPoints, normalizedimagePoints)
     if debug:
       print("Starting ippe pose calculation")
     x1 = objectPoints[:3,:] # 3D coordinates (assuming a plane Z = 0)
@@ -54,7 +57,7 @@ def pose_ippe_both(objectPoints, normalizedimagePoints, debug = False):
 
 
 
-def pose_ippe_best(objectPoints, normalizedimagePoints, debug = False):
+def pose_ippe_best(objectPoints, normalizedimagePoints, debug = False, mask = None):
     """ This function calculates the pose using the IPPE algorithm which
     returns to possible poses. The best pose is then selected based on
     the reprojection error and that the objectPoints have to be in front of the
@@ -62,7 +65,9 @@ def pose_ippe_best(objectPoints, normalizedimagePoints, debug = False):
 
     objectPoints:  4xn homogeneous 3D object coordinates
     normalizedimagePoints: 3xn homogeneous normalized pixel coordinates
+    mask: optional boolean array of valid points (e.g. from a SensorPipeline)
     """
+    objectPoints, normalizedimagePoints = select_valid(mask, objectPoints, normalizedimagePoints)
     if debug:
       print("Starting ippe pose calculation")
     x1 = objectPoints[:3,:] # 3D coordinates (assuming a plane Z = 0)
@@ -8,14 +8,17 @@ Created on Mon Jul 10 18:33:14 2017
 
 import cv2
 import numpy as np
+from vision.sensor import select_valid
 
-def pose_pnp(objectPoints, imagePoints, K, debug = False, method = cv2.SOLVEPNP_ITERATIVE, Ransac = False):
+def pose_pnp(objectPoints, imagePoints, K, debug = False, method = cv2.SOLVEPNP_ITERATIVE, Ransac = False, mask = None):
     """ This function calculates the pose using the OpenCV solvePnP algorithm
     objectPoints:  4xn homogeneous 3D object coordinates
     normalizedimagePoints: 3xn homogeneous normalized pixel coordinates
     K: Camera matrix
     method: cv2.SOLVEPNP_P3P, cv2.SOLVEPNP_DLS, cv2.SOLVEPNP_EPNP, cv2.SOLVEPNP_ITERATIVE
+    mask: optional boolean array of valid points (e.g. from a SensorPipeline)
     """
+    objectPoints, imagePoints = select_valid(mask, objectPoints, imagePoints)
     objPoints = objectPoints[:3,:].T
     imgPoints = imagePoints[:2,:].T
 